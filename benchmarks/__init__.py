@@ -0,0 +1,13 @@
+"""Benchmarks for the Conquest API Python Wrapper
+
+Scenarios are run against a local mock of the Conquest API (see
+benchmarks.server) and report requests per second, p50/p99 request latency and
+peak memory, so regressions in the wrapper's hot paths can be caught without a
+Conquest server.
+
+Usage:
+    python -m benchmarks                        # run every scenario
+    python -m benchmarks bulk_get token_storm   # run selected scenarios
+    python -m benchmarks --latency 0.005 --json results.json
+
+"""
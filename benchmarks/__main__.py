@@ -0,0 +1,75 @@
+"""Runs the benchmark scenarios against a local mock Conquest server.
+
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.scenarios import SCENARIOS, reset_server
+from benchmarks.server import MockServer
+
+
+def percentile(values:list, percent:float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values)-1, int(round(percent/100*(len(values)-1))))]
+
+
+def run(name:str, url:str, args:argparse.Namespace) -> dict:
+    function, config = SCENARIOS[name]
+    config = { key: value(args.scale) if callable(value) else value for key, value in config.items() }
+    config.update(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    reset_server(url, config)
+    start = time.perf_counter()
+    result = function(url, args.scale)
+    elapsed = time.perf_counter()-start
+    durations = result.pop("recorder").durations
+    summary = dict(scenario=name, requests=len(durations), seconds=round(elapsed, 3),
+                   requests_per_second=round(len(durations)/elapsed, 1),
+                   p50_ms=round(percentile(durations, 50)*1000, 2),
+                   p99_ms=round(percentile(durations, 99)*1000, 2),
+                   mean_ms=round(statistics.fmean(durations)*1000, 2) if durations else 0.0)
+    if args.memory:
+        # measured on a second run, so tracing doesn't slow the timed run
+        reset_server(url, config)
+        tracemalloc.start()
+        function(url, args.scale)
+        summary["peak_memory_mb"] = round(tracemalloc.get_traced_memory()[1]/1024/1024, 2)
+        tracemalloc.stop()
+    summary.update(result)
+    return summary
+
+
+def main(argv:list=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run (default: all). One of {', '.join(sorted(SCENARIOS))}.")
+    parser.add_argument("--latency", type=float, default=0.002, help="Server latency in seconds (default: 0.002).")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra server latency in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Chance of a 503 response.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier applied to each scenario's size.")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Skip the peak memory run.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios)-set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    results = []
+    with MockServer() as server:
+        for name in args.scenarios or sorted(SCENARIOS):
+            summary = run(name, server.url, args)
+            results.append(summary)
+            print(json.dumps(summary))
+            sys.stdout.flush()
+    if args.json:
+        with open(args.json, "w") as open_file:
+            json.dump(results, open_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
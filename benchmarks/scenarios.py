@@ -0,0 +1,152 @@
+"""Benchmark scenarios
+
+Each scenario is a function taking the mock server's url and a scale factor,
+and returning a dict of results. Request latencies are recorded by a Recorder
+attached to the scenario's Client, and server side counters are read from the
+mock server's '_stats' endpoint.
+
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import Callable, Dict, NoReturn
+
+import conquest_api
+
+SCENARIOS = {} #: name -> (function, server configuration)
+
+
+def scenario(name:str, **config) -> Callable:
+    """Decorator registering a scenario, along with the mock server configuration it needs.
+
+    Configuration values may be callables, which are called with the scale.
+
+    """
+    def register(function):
+        SCENARIOS[name] = (function, config)
+        return function
+    return register
+
+
+class Recorder(object):
+    def __init__(self, client:conquest_api.Client) -> None:
+        """Records the duration of every request sent by a client.
+
+        """
+        self.durations = []
+        self._lock = threading.Lock()
+        send = client.session.request
+
+        def request(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return send(*args, **kwargs)
+            finally:
+                duration = time.perf_counter()-start
+                with self._lock:
+                    self.durations.append(duration)
+
+        client.session.request = request
+
+
+def server_stats(url:str) -> Dict[str, int]:
+    with urllib.request.urlopen(url+"_stats") as response:
+        return json.loads(response.read())
+
+
+def reset_server(url:str, config:dict) -> NoReturn:
+    request = urllib.request.Request(url+"_reset", data=json.dumps(config).encode("utf-8"), method="POST")
+    urllib.request.urlopen(request).close()
+
+
+def make_token(url:str, recorder:bool=True, **client_options) -> conquest_api.Token:
+    client = conquest_api.Client(**client_options)
+    token = conquest_api.Token(url, "benchmark", "password", "Conquest Live", client=client)
+    if recorder:
+        token.recorder = Recorder(client)
+    return token
+
+
+@scenario("bulk_get")
+def bulk_get(url:str, scale:float) -> dict:
+    """Asset.get_detailed over a list of ids with 16 workers.
+
+    """
+    count = int(2000*scale)
+    token = make_token(url, pool_size=16)
+    result = conquest_api.Asset(token).get_detailed(list(range(1, count+1)), workers=16)
+    return dict(recorder=token.recorder, found=len(result), missing=len(result.missing), failed=len(result.failed))
+
+
+@scenario("bulk_get_serial")
+def bulk_get_serial(url:str, scale:float) -> dict:
+    """Asset.get_basic over a list of ids one at a time.
+
+    """
+    count = int(500*scale)
+    token = make_token(url)
+    result = conquest_api.Asset(token).get_basic(list(range(1, count+1)))
+    return dict(recorder=token.recorder, found=len(result))
+
+
+@scenario("import_polling", batch_time=1.0, batch_row_time=0.001)
+def import_polling(url:str, scale:float) -> dict:
+    """ImportQueue importing 20 files, counting state requests.
+
+    """
+    directory = tempfile.mkdtemp(prefix="conquest_bench_")
+    filenames = []
+    for number in range(int(20*scale)):
+        filename = os.path.join(directory, f"import_{number}.csv")
+        with open(filename, "w", newline="") as open_file:
+            open_file.write("ParentCode,AssetDescription,TypeID,Status\r\n")
+            for row in range(200*(number % 5+1)):
+                open_file.write(f"001.003.020.{row:03d},Benchmark asset {row},1147,Proposed\r\n")
+        filenames.append(filename)
+    token = make_token(url)
+    with conquest_api.ImportQueue(token, workers=4) as queue:
+        handles = [queue.submit(filename, "Asset") for filename in filenames]
+        completed = sum(handle.result()["success"] for handle in queue.as_completed(handles))
+    stats = server_stats(url)
+    return dict(recorder=token.recorder, batches=len(filenames), completed=completed,
+                state_polls=stats.get("GET api/import/state", 0))
+
+
+@scenario("token_storm", token_lifetime=181)
+def token_storm(url:str, scale:float) -> dict:
+    """16 workers sharing one token which needs refreshing about once a second.
+
+    """
+    count = int(3000*scale)
+    token = make_token(url, pool_size=16)
+    conquest_api.Asset(token).get_basic(list(range(1, count+1)), workers=16)
+    stats = server_stats(url)
+    return dict(recorder=token.recorder, password_grants=stats.get("token password", 0),
+                refreshes=stats.get("token refresh_token", 0),
+                rejected_refreshes=stats.get("token refresh rejected", 0),
+                unauthorised=stats.get("unauthorised", 0))
+
+
+@scenario("error_csv", batch_time=0.0, error_csv_rows=lambda scale: int(200000*scale))
+def error_csv(url:str, scale:float) -> dict:
+    """Downloading a 200,000 row error CSV to file and iterating it.
+
+    """
+    directory = tempfile.mkdtemp(prefix="conquest_bench_")
+    filename = os.path.join(directory, "errors.csv")
+    with open(filename, "w", newline="") as open_file:
+        open_file.write("ParentCode,AssetDescription,TypeID,Status\r\n")
+        open_file.write("001.003.020.001,\"ERROR, with a comma\",1147,Proposed\r\n")
+    token = make_token(url)
+    importer = conquest_api.Import(token)
+    conquest_api.conquest_api.output_path = directory
+    try:
+        result = importer.add(filename, "Asset")
+    finally:
+        conquest_api.conquest_api.output_path = None
+    rows = sum(1 for _ in importer.iter_errors(result["batch"]))
+    return dict(recorder=token.recorder, error_file_bytes=os.path.getsize(result["error_file"]), error_rows=rows)
@@ -0,0 +1,357 @@
+"""Mock Conquest API server used by the benchmarks
+
+A small stand-in for the Conquest API, implementing the endpoints used by
+conquest_api with configurable latency, error rates and import processing
+times. Records are generated from their ids so no data needs to be loaded.
+
+Endpoints:
+    POST   api/token                  password and refresh_token grants
+    GET    api/Asset/{id}             detailed asset record
+    GET    api/Asset/basic/{id}       basic asset record
+    POST   api/asset/find_by_field    find an asset by field value
+    GET    api/Action/{id}            detailed action record
+    DELETE api/Action/{id}            delete an action
+    POST   api/action/find_by_field   find an action by field value
+    POST   api/import/add/{type}      start an import batch
+    GET    api/import/state/{batch}   state of an import batch
+    GET    api/import/error_csv/{batch}
+    GET    api/system/connections|version|whoami
+    GET    _stats                     request counters (not part of the API)
+    POST   _reset                     reset counters and configuration
+
+Usage:
+    python -m benchmarks.server --port 8080 --latency 0.01 --error-rate 0.01
+
+"""
+
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NoReturn
+
+DEFAULTS = dict(
+    latency=0.0,             # seconds added to every API response
+    jitter=0.0,              # random extra latency, up to this many seconds
+    error_rate=0.0,          # chance of a 503 response to any authorised request
+    missing_every=10,        # ids divisible by this return an ErrorType (0 disables)
+    user_fields=50,          # number of UserText/UserNumber fields in detailed records
+    token_lifetime=3600,     # seconds before an access token expires
+    batch_time=0.5,          # seconds each import batch takes to process
+    batch_row_time=0.0,      # extra processing seconds per imported row
+    error_marker="ERROR",    # imported rows containing this text are rejected
+    error_csv_rows=0,        # if set, rejected batches report this many error rows
+)
+
+
+class State(object):
+    def __init__(self, config:dict) -> None:
+        """Shared state of the mock server.
+
+        """
+        self.config = dict(DEFAULTS, **config)
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.tokens = {} #: access token -> expiry time
+        self.refresh_tokens = set()
+        self.batches = {} #: batch id -> [finish time, error rows, header]
+        self.deleted = set()
+
+    def count(self, name:str) -> NoReturn:
+        with self.lock:
+            self.counts[name] += 1
+
+
+def detailed_record(kind:str, item:int, user_fields:int) -> dict:
+    record = { f"{kind}ID": item,
+               f"{kind}Description": f"{kind} {item} - generated by the benchmark server",
+               "ParentID": item//2 if kind == "Asset" else None,
+               "AssetID": item if kind == "Asset" else item*3,
+               "DepartmentID": item % 7,
+               "FamilyCode": "005.004.{:03d}.{:03d}".format(item % 997, item % 991),
+               "Location": None }
+    for number in range(1, user_fields+1):
+        record[f"UserText{number}"] = f"text-{item}-{number}"
+        record[f"UserNumber{number}"] = item*number/10
+    return record
+
+
+def basic_record(item:int) -> dict:
+    return { "AssetID": item,
+             "AssetDescription": f"Asset {item} - generated by the benchmark server",
+             "DepartmentID": item % 7,
+             "FamilyCode": "005.004.{:03d}.{:03d}".format(item % 997, item % 991),
+             "Location": None,
+             "ParentID": item//2 }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, so avoid delayed ACK stalls
+    disable_nagle_algorithm = True
+    state = None #: set on a subclass by 'create_server'
+
+    def log_message(self, *args) -> NoReturn:
+        pass
+
+    def send(self, body, status:int=200, content_type:str="application/json", headers:dict=None) -> NoReturn:
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def path_parts(self) -> list:
+        # the wrapper joins urls with extra slashes, e.g. 'host//api/Asset/1'
+        path = urllib.parse.urlparse(self.path).path
+        return [part for part in path.split("/") if part]
+
+    def delay(self) -> NoReturn:
+        config = self.state.config
+        wait = config["latency"]+random.uniform(0, config["jitter"])
+        if wait:
+            time.sleep(wait)
+
+    def authorised(self) -> bool:
+        header = self.headers.get("Authorization", "")
+        token = header[7:] if header.lower().startswith("bearer ") else None
+        expire = self.state.tokens.get(token)
+        if expire is None or expire < time.time():
+            self.state.count("unauthorised")
+            self.send({ "Message": "Authorization has been denied for this request." }, 401)
+            return False
+        if random.random() < self.state.config["error_rate"]:
+            self.state.count("unavailable")
+            self.send({ "Message": "Service unavailable" }, 503)
+            return False
+        return True
+
+    def do_GET(self) -> NoReturn:
+        self.route("GET")
+
+    def do_POST(self) -> NoReturn:
+        self.route("POST")
+
+    def do_DELETE(self) -> NoReturn:
+        self.route("DELETE")
+
+    def route(self, method:str) -> NoReturn:
+        parts = self.path_parts()
+        body = self.read_body() if method == "POST" else b""
+        if parts == ["_stats"]:
+            with self.state.lock:
+                return self.send(dict(self.state.counts))
+        if parts == ["_reset"]:
+            config = json.loads(body or b"{}")
+            with self.state.lock:
+                self.state.counts.clear()
+                self.state.config = dict(DEFAULTS, **config)
+            return self.send({})
+        # ignore any prefix before the last leading 'api', e.g. 'ConquestApi/api/api/...'
+        while len(parts) > 1 and (parts[0].lower() != "api" or parts[1].lower() == "api"):
+            parts.pop(0)
+        parts = [part.lower() for part in parts[:-1]]+parts[-1:]
+        self.delay()
+        if parts[:2] == ["api", "token"] and method == "POST":
+            return self.token(urllib.parse.parse_qs(body.decode("utf-8")))
+        if not self.authorised():
+            return
+        endpoint = "/".join(re.sub(r"^\d+$", "{id}", part) for part in parts[:3])
+        self.state.count(f"{method} {endpoint}")
+        if parts[:2] == ["api", "asset"] and len(parts) == 3 and method == "GET":
+            return self.record("Asset", parts[2], detailed=True)
+        if parts[:3] == ["api", "asset", "basic"] and method == "GET":
+            return self.record("Asset", parts[3], detailed=False)
+        if parts[:2] == ["api", "action"] and len(parts) == 3 and method == "GET":
+            return self.record("Action", parts[2], detailed=True)
+        if parts[:2] == ["api", "action"] and len(parts) == 3 and method == "DELETE":
+            return self.delete(parts[2])
+        if parts[1:3] == ["asset", "find_by_field"] or parts[1:3] == ["action", "find_by_field"]:
+            return self.find("Asset" if parts[1] == "asset" else "Action", urllib.parse.parse_qs(body.decode("utf-8")))
+        if parts[:3] == ["api", "import", "add"]:
+            return self.import_add(body)
+        if parts[:3] == ["api", "import", "state"]:
+            return self.import_state(parts[3])
+        if parts[:3] == ["api", "import", "error_csv"]:
+            return self.import_errors(parts[3])
+        if parts[:2] == ["api", "system"]:
+            return self.system(parts[2])
+        self.send({ "ErrorType": "NotFound", "Message": "No such endpoint" }, 404)
+
+    def token(self, form:dict) -> NoReturn:
+        grant = form.get("grant_type", [""])[0]
+        state = self.state
+        with state.lock:
+            state.counts[f"token {grant}"] += 1
+            if grant == "refresh_token":
+                refresh_token = form.get("refresh_token", [""])[0]
+                if refresh_token not in state.refresh_tokens:
+                    state.counts["token refresh rejected"] += 1
+                    return self.send({ "error": "invalid_grant", "error_description": "The refresh token is invalid." }, 400)
+                # refresh tokens can only be used once
+                state.refresh_tokens.discard(refresh_token)
+            elif grant != "password" or form.get("password", [""])[0] == "":
+                return self.send({ "error": "invalid_grant", "error_description": "The user name or password is incorrect." }, 400)
+            access_token, refresh_token = uuid.uuid4().hex, uuid.uuid4().hex
+            lifetime = state.config["token_lifetime"]
+            state.tokens[access_token] = time.time()+lifetime
+            state.refresh_tokens.add(refresh_token)
+        self.send({ "access_token": access_token, "token_type": "bearer", "expires_in": lifetime, "refresh_token": refresh_token })
+
+    def not_found(self, kind:str, item:str) -> bool:
+        every = self.state.config["missing_every"]
+        return not item.isdigit() or (every and int(item) % every == 0) or (kind == "Action" and item in self.state.deleted)
+
+    def record(self, kind:str, item:str, detailed:bool) -> NoReturn:
+        if self.not_found(kind, item):
+            return self.send({ "ErrorType": "NotFound", "Message": f"{kind} {item} not found" }, 404)
+        if detailed:
+            return self.send(detailed_record(kind, int(item), self.state.config["user_fields"]))
+        self.send(basic_record(int(item)))
+
+    def delete(self, item:str) -> NoReturn:
+        if self.not_found("Action", item):
+            return self.send({ "ErrorType": "NotFound", "Message": f"Action {item} not found" }, 404)
+        with self.state.lock:
+            self.state.deleted.add(item)
+        self.send(b"", 200)
+
+    def find(self, kind:str, form:dict) -> NoReturn:
+        field, value = form.get("Field", [""])[0], form.get("Value", [""])[0]
+        match = re.match(r"^text-(\d+)-(\d+)$", value)
+        if field.startswith("UserText") and match and not self.not_found(kind, match.group(1)):
+            return self.send(detailed_record(kind, int(match.group(1)), self.state.config["user_fields"]))
+        self.send({ "ErrorType": "NotFound", "Message": "No unique match found" }, 404)
+
+    def import_add(self, body:bytes) -> NoReturn:
+        # pull the uploaded file out of the multipart body
+        content_type = self.headers.get("Content-Type", "")
+        boundary = content_type.split("boundary=")[-1].encode("utf-8")
+        data = b""
+        for part in body.split(b"--"+boundary):
+            if b"\r\n\r\n" in part:
+                data = part.split(b"\r\n\r\n", 1)[1].rsplit(b"\r\n", 1)[0]
+                break
+        rows = list(csv.reader(io.StringIO(data.decode("utf-8-sig"), newline="")))
+        header, rows = (rows[0], rows[1:]) if rows else ([], [])
+        config = self.state.config
+        errors = [row for row in rows if any(config["error_marker"] in value for value in row)]
+        if errors and config["error_csv_rows"]:
+            errors = [errors[index % len(errors)] for index in range(config["error_csv_rows"])]
+        batch = str(uuid.uuid4())
+        with self.state.lock:
+            finish = time.time()+config["batch_time"]+config["batch_row_time"]*len(rows)
+            self.state.batches[batch] = [finish, errors, header]
+        self.send(batch)
+
+    def import_state(self, batch:str) -> NoReturn:
+        finish, errors, _ = self.state.batches[batch]
+        if time.time() < finish:
+            return self.send({ "Status": "Processing", "Error": None })
+        if errors:
+            return self.send({ "Status": "Failed", "Error": f"{len(errors)} rows failed validation. Output to CSV for details." })
+        self.send({ "Status": "Completed", "Error": None })
+
+    def import_errors(self, batch:str) -> NoReturn:
+        _, errors, header = self.state.batches[batch]
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(header+["Error"])
+        for row in errors:
+            writer.writerow(row+["Row contains an invalid value, see the \"Error\" column"])
+        self.send(output.getvalue().encode("utf-8"), content_type="text/csv")
+
+    def system(self, name:str) -> NoReturn:
+        if name == "connections":
+            return self.send(["Conquest Live", "Conquest Test", "Conquest Training"])
+        if name == "version":
+            return self.send({ "Version": "benchmark", "ApiVersion": "benchmark" })
+        self.send("benchmark")
+
+
+def create_server(host:str="127.0.0.1", port:int=0, **config) -> ThreadingHTTPServer:
+    """Creates (but doesn't start) a mock server. Port 0 picks a free port.
+
+    """
+    handler = type("BoundHandler", (Handler,), { "state": State(config) })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def _serve(host:str, port:int, config:dict, ready:multiprocessing.Queue) -> NoReturn:
+    server = create_server(host, port, **config)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+class MockServer(object):
+    def __init__(self, host:str="127.0.0.1", port:int=0, **config) -> None:
+        """Mock server run in a separate process, so it doesn't share the GIL
+        with the client being measured.
+
+        Args:
+            host (str, optional): Interface to listen on.
+            port (int, optional): Port to listen on, 0 picks a free port.
+            **config: Overrides of DEFAULTS.
+
+        Examples:
+            >>> with MockServer(latency=0.005) as server:
+            ...     token = conquest_api.Token(server.url, 'user', 'password', 'Conquest Live')
+
+        """
+        self.host = host
+        self.port = port
+        self.config = config
+        self.process = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    def start(self) -> "MockServer":
+        ready = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=_serve, args=(self.host, self.port, self.config, ready), daemon=True)
+        self.process.start()
+        self.port = ready.get(timeout=30)
+        return self
+
+    def stop(self) -> NoReturn:
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+            self.process = None
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *args) -> NoReturn:
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Conquest API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    for name, value in DEFAULTS.items():
+        parser.add_argument("--"+name.replace("_", "-"), type=type(value), default=value)
+    args = vars(parser.parse_args())
+    server = create_server(args.pop("host"), args.pop("port"), **args)
+    print(f"Mock Conquest API listening on http://{server.server_address[0]}:{server.server_address[1]}/")
+    server.serve_forever()
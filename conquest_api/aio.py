@@ -0,0 +1,557 @@
+"""Conquest API Python Wrapper - asyncio client
+
+This module mirrors the Token, Import, Asset, Action and System classes of the
+conquest_api module for use within an asyncio event loop. Method names and
+return objects are the same as their blocking counterparts, but every method
+which talks to the API is a coroutine.
+
+Requirements:
+    aiohttp
+    The dependency can be installed with the 'async' extra:
+    pip install "conquest_api[async] @ git+https://github.com/nwduncan/conquest_api.git"
+
+Examples:
+    >>> from conquest_api import aio
+    >>> async def main():
+    ...     async with aio.AsyncClient() as client:
+    ...         token = aio.AsyncToken(api_url, username, password, connection, client=client)
+    ...         asset = aio.AsyncAsset(token)
+    ...         return await asset.get_detailed(asset_ids, limit=100)
+
+"""
+
+import asyncio
+import codecs
+import contextlib
+import os
+import ssl
+import urllib.parse
+from datetime import datetime as dt
+from datetime import timedelta
+from typing import AsyncIterator, Awaitable, Callable, Iterable, List, NoReturn, Tuple, Union
+
+import aiohttp
+
+from conquest_api import conquest_api
+
+
+# helpers
+async def _gather_many(fetch:Callable[..., Awaitable], items:Iterable, limit:int) -> List[Tuple]:
+    """Awaits 'fetch' for each item with at most 'limit' running at once.
+
+    Args:
+        fetch (callable): Coroutine function called with a single item.
+        items (iterable): Items to fetch.
+        limit (int): Maximum number of concurrent calls.
+
+    Returns:
+        List of (item, result) tuples in the same order as 'items'.
+
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with semaphore:
+            return item, await fetch(item)
+
+    return await asyncio.gather(*(run(item) for item in items))
+
+
+async def _decode(response:aiohttp.ClientResponse) -> object:
+    # parses the body using the module level JSON codec. The response has been
+    # released by AsyncClient.request, so its body is only available as text
+    return conquest_api.get_json_codec().loads(await response.text())
+
+
+async def _find_by_field(token:"AsyncToken", url:str, field:str, value:Union[str, int]) -> dict:
+    headers = { "Content-Type": "application/x-www-form-urlencoded" }
+    payload = { "Field": str(field),
+                "Value": str(value) }
+    response = await token.client.request("POST", url, token=token, allowed=(404,), data=urllib.parse.urlencode(payload), headers=headers)
+    data = await _decode(response)
+    if "ErrorType" in data:
+        data = {}
+    return data
+
+
+# classes
+class AsyncClient(object):
+    def __init__(self, verify:Union[bool, str, None]=None, timeout:Union[float, tuple, None]=(10, 120), pool_size:int=100) -> None:
+        """Asyncio HTTP client class shared by all other aio classes.
+
+        The asyncio equivalent of conquest_api.Client. An AsyncClient owns a
+        single aiohttp.ClientSession, which is created on first use so that the
+        client can be initialised outside of a running event loop. Unlike
+        Client, failed and rate limited requests are not retried.
+
+        Args:
+            verify (bool or str, optional): Whether to verify the server's TLS
+                certificate, or a path to a CA bundle. Defaults to the
+                conquest_api module level 'verify' value.
+            timeout (float or tuple, optional): Timeout in seconds applied to each
+                request. A (connect, read) tuple may also be given. None waits
+                indefinitely. Defaults to (10, 120).
+            pool_size (int, optional): Maximum number of simultaneous connections.
+                Defaults to 100.
+
+        """
+        self.verify = conquest_api.verify if verify is None else verify
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.session = None
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        if self.verify is True:
+            ssl_option = None
+        elif self.verify is False:
+            ssl_option = False
+        else:
+            ssl_option = ssl.create_default_context(cafile=self.verify)
+        if self.timeout is None:
+            timeout = aiohttp.ClientTimeout(total=None)
+        elif isinstance(self.timeout, tuple):
+            timeout = aiohttp.ClientTimeout(total=None, connect=self.timeout[0], sock_read=self.timeout[1])
+        else:
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+        connector = aiohttp.TCPConnector(limit=self.pool_size, ssl=ssl_option)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def request(self, method:str, url:str, token:Union["AsyncToken", None]=None,
+                      allowed:Iterable[int]=(), **kwargs) -> aiohttp.ClientResponse:
+        """Sends a request using the shared session.
+
+        The response body is read before returning, so the connection is free
+        to be reused by the time the caller receives the response.
+
+        Args:
+            method (str): HTTP method, e.g. 'GET'.
+            url (str): URL of the request.
+            token (AsyncToken or None, optional): If provided, the connection name
+                and bearer token headers are added to the request.
+            allowed (iterable, optional): Error statuses the caller handles
+                itself, e.g. 404 for lookups. Defaults to none.
+            **kwargs: Passed through to aiohttp.ClientSession.request.
+
+        Returns:
+            An aiohttp.ClientResponse object with its body already read.
+
+        Raises:
+            aiohttp.ClientResponseError: If the response has an error status
+                (400 or above) which isn't allowed.
+
+        """
+        await self._prepare(token, kwargs)
+        async with self.session.request(method, url, **kwargs) as response:
+            await response.read()
+        if response.status >= 400 and response.status not in allowed:
+            response.raise_for_status()
+        return response
+
+    @contextlib.asynccontextmanager
+    async def stream(self, method:str, url:str, token:Union["AsyncToken", None]=None, **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Sends a request, returning the response before its body is read.
+
+        Used as an async context manager for large responses, such as error
+        CSVs, whose body is read in chunks inside the context. Arguments are the
+        same as 'request'.
+
+        """
+        await self._prepare(token, kwargs)
+        async with self.session.request(method, url, **kwargs) as response:
+            yield response
+
+    async def _prepare(self, token:Union["AsyncToken", None], kwargs:dict) -> NoReturn:
+        if self.session is None:
+            self.session = self._create_session()
+        if token is not None:
+            headers = dict(kwargs.pop("headers", None) or {})
+            headers["X-ConnectionName"] = token.connection
+            headers["Authorization"] = "bearer "+await token.get_token()
+            kwargs["headers"] = headers
+
+    async def close(self) -> NoReturn:
+        """Closes the session and any pooled connections.
+
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, *args) -> NoReturn:
+        await self.close()
+
+
+class AsyncToken(object):
+    def __init__(self, api_url:str, username:str, password:str, connection:str, client:Union[AsyncClient, None]=None) -> None:
+        """Asyncio token handling class.
+
+        The asyncio equivalent of conquest_api.Token. Concurrent tasks which find
+        the token missing or expired wait on a single request for a new token.
+
+        Args:
+            api_url (str): URL of the Conquest API. E.g. 'https://api.domain.gov.au'.
+            username (str): Username to be used for generating a token.
+            password (str): Password to be used for generating a token.
+            connection (str): Name of the Conquest connection to generate a token for.
+            client (AsyncClient or None, optional): Client used to send requests. A
+                new AsyncClient is created if one is not provided.
+
+        """
+        self.client = AsyncClient() if client is None else client
+        self.api_url = api_url
+        self.token_url = api_url+"api/token"
+        self.connection = connection
+        self.username = username
+        self.password = password
+        self.expire = None #: datetime object pointing to time of token expiration
+        self.token = None #: str representing the token
+        self.refresh_token = None #: str representing the refresh token code
+        self._lock = asyncio.Lock()
+
+    async def get_token(self) -> str:
+        """Generate token method.
+
+        See conquest_api.Token.get_token for details.
+
+        """
+        async with self._lock:
+            if self.token is None:
+                await self._login()
+            elif (dt.now() + timedelta(seconds=180)) >= self.expire:
+                await self._refresh()
+            return self.token
+
+    async def refresh(self) -> NoReturn:
+        """The refresh method refreshes the token using the refresh_token code.
+
+        If the refresh token is rejected (e.g. it has already been used) a new
+        token is generated with the provided credentials instead.
+
+        """
+        async with self._lock:
+            await self._refresh()
+
+    async def _refresh(self) -> NoReturn:
+        payload = { "grant_type": "refresh_token",
+                    "refresh_token": self.refresh_token }
+        response = await self._request_token(payload)
+        if "access_token" in response:
+            self._set_token(response)
+        else:
+            await self._login()
+
+    async def _login(self) -> NoReturn:
+        payload = { "grant_type": "password",
+                    "username": self.username,
+                    "password": self.password }
+        response = await self._request_token(payload)
+        try:
+            self._set_token(response)
+        # error is raised if token generation was unsuccesful
+        except KeyError:
+            raise ValueError(f"Unable to generate access token - {response['error']}: {response['error_description']}")
+
+    async def _request_token(self, payload:dict) -> dict:
+        headers = { "X-ConnectionName": self.connection,
+                    "Accept": "application/json",
+                    "Content-Type": "application/x-www-form-urlencoded" }
+        # rejected credentials and refresh tokens are answered with an error body
+        response = await self.client.request("POST", self.token_url, allowed=(400, 401), data=urllib.parse.urlencode(payload), headers=headers)
+        return await _decode(response)
+
+    def _set_token(self, response:dict) -> NoReturn:
+        self.token = response["access_token"]
+        self.refresh_token = response["refresh_token"]
+        self.expire = dt.now()+timedelta(seconds=response["expires_in"])
+
+
+class AsyncImport(object):
+    def __init__(self, token:AsyncToken) -> None:
+        """Asyncio import class used to import files in to Conquest.
+
+        The asyncio equivalent of conquest_api.Import. The state of an import is
+        polled without blocking the event loop, so many imports can be awaited
+        at once.
+
+        Args:
+            token (AsyncToken): AsyncToken object
+
+        """
+        self.token = token
+        self.import_types = ["Action", "Asset", "Defect", "Request", "AssetInspection", "RiskEvent", "LogBook"]
+
+    async def add(self, filename:str, import_type:str, poll_interval:float=0.1) -> dict:
+        """A coroutine for importing files in to Conquest.
+
+        Args:
+            filename (str): Path fo the file to be imported in to Conquest
+            import_type (str): Type of import to be attempted. See self.import_types
+                or the API documentation for a list of valid import types.
+            poll_interval (float, optional): Seconds to wait between checks of the
+                import state. Defaults to 0.1.
+
+        Returns:
+            A dict containing the batch id (str), attempt successfulness (bool),
+            error messages (str), and error files generated (str).
+
+        """
+        # make sure we have a valid import type
+        if import_type not in self.import_types:
+            return self.result(None, False, f"Import type of {import_type} is not a valid option.", None)
+        with open(filename, "rb") as open_file:
+            url = self.token.api_url+"api/import/add/"+str(import_type)
+            data = aiohttp.FormData()
+            data.add_field("files", open_file, filename=os.path.basename(filename))
+            response = await self.token.client.request("POST", url, token=self.token, data=data)
+        batch = await _decode(response)
+        while True:
+            status = await self.get_state(batch)
+            # wait
+            if status["Status"] == "Processing":
+                await asyncio.sleep(poll_interval)
+            # success
+            elif status["Status"] == "Completed":
+                return self.result(batch, True)
+            # error
+            else:
+                if "Output to CSV" in status["Error"]:
+                    error_csv = await self.output_to_csv(batch, filename)
+                else:
+                    error_csv = None
+                return self.result(batch, False, status["Error"], error_csv)
+
+    async def get_state(self, batch:str) -> dict:
+        """A coroutine for getting the state of a batch.
+
+        Args:
+            batch (str): Id of the batch to check.
+
+        Returns:
+            A response from the server (dict).
+
+        """
+        url = self.token.api_url+r"api/import/state/"+batch
+        response = await self.token.client.request("GET", url, token=self.token)
+        return await _decode(response)
+
+    async def output_to_csv(self, batch:str, filename:str) -> str:
+        """The coroutine used to 'Output to CSV' when an error is found during an import.
+
+        The error CSV is streamed from the server and written to the output path
+        a chunk at a time, so large error files are never held in memory.
+
+        Args:
+            batch (str): Batch id of the item with errors to output.
+            filename (str): Filename of the file which attempted an import.
+
+        Returns:
+            Filename (str) of the error CSV.
+
+        """
+        url = self.token.api_url+r"/api/import/error_csv/"+batch
+        name, ext = os.path.splitext(os.path.basename(filename))
+        out_filename = os.path.join(conquest_api.get_output_path(), name+"_ERROR"+ext)
+        # decode as it arrives so a character split between chunks (or a BOM) is handled
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        async with self.token.client.stream("GET", url, token=self.token) as response:
+            response.raise_for_status()
+            with open(out_filename, "w", newline="", encoding="utf-8") as open_file:
+                async for chunk in response.content.iter_chunked(65536):
+                    open_file.write(decoder.decode(chunk))
+                open_file.write(decoder.decode(b"", final=True))
+        return out_filename
+
+    def result(self, batch:Union[str, None], success:bool, error_msg:Union[str, None]=None, error_file:Union[str, None]=None) -> dict:
+        """Returns a dict containing details about an import process.
+
+        See conquest_api.Import.result for details.
+
+        """
+        return dict(batch=batch, success=success, error_msg=error_msg, error_file=error_file)
+
+
+class AsyncAsset(object):
+    def __init__(self, token:AsyncToken) -> None:
+        """Asyncio asset class for accessing data relating to assets.
+
+        The asyncio equivalent of conquest_api.Asset. When a list of assets is
+        given they are requested concurrently, with at most 'limit' requests in
+        flight at once.
+
+        Args:
+            token (AsyncToken): AsyncToken object.
+
+        """
+        self.token = token
+
+    async def get_detailed(self, assets:Union[str, int, list], limit:int=50) -> dict:
+        """Coroutine which returns all attributes for an asset/list of assets.
+
+        Args:
+            assets (str or int or list): Assets for which data will be returned.
+            limit (int, optional): Maximum number of concurrent requests. Defaults
+                to 50.
+
+        Returns:
+            Dict containing a dict object for each asset queried.
+
+        """
+        assets = [assets] if type(assets) != list else assets
+        fetched = await _gather_many(self._get_detailed, assets, limit)
+        return { asset: record for asset, record in fetched if record is not None }
+
+    async def get_basic(self, assets:Union[str, int, list], limit:int=50) -> dict:
+        """Coroutine which returns basic attributes for an asset/list of assets.
+
+        Args:
+            assets (str or int or list): Assets for which data will be returned.
+            limit (int, optional): Maximum number of concurrent requests. Defaults
+                to 50.
+
+        Returns:
+            Dict containing a dict object for each asset queried.
+
+        """
+        assets = [assets] if type(assets) != list else assets
+        fetched = await _gather_many(self._get_basic, assets, limit)
+        return { asset: record for asset, record in fetched if record is not None }
+
+    async def find_by_field(self, field:str, value:Union[str, int]) -> dict:
+        """Coroutine which returns all attributes for an asset based on a field search.
+
+        See conquest_api.Asset.find_by_field for details.
+
+        """
+        url = self.token.api_url+r"/api/asset/find_by_field"
+        asset_data = await _find_by_field(self.token, url, field, value)
+        return asset_data
+
+    async def _get_detailed(self, asset:Union[str, int]) -> Union[dict, None]:
+        url = self.token.api_url+r"/api/Asset/"+str(asset)
+        response = await self.token.client.request("GET", url, token=self.token, allowed=(404,))
+        response = await _decode(response)
+        return None if "ErrorType" in response else response
+
+    async def _get_basic(self, asset:Union[str, int]) -> Union[dict, None]:
+        url = self.token.api_url+r"/api/Asset/basic/"+str(asset)
+        response = await self.token.client.request("GET", url, token=self.token, allowed=(404,))
+        response = await _decode(response)
+        return None if "ErrorType" in response else response
+
+
+class AsyncAction(object):
+    def __init__(self, token:AsyncToken) -> None:
+        """Asyncio action class for accessing data relating to actions.
+
+        The asyncio equivalent of conquest_api.Action. When a list of actions is
+        given they are requested concurrently, with at most 'limit' requests in
+        flight at once.
+
+        Args:
+            token (AsyncToken): AsyncToken object.
+
+        """
+        self.token = token
+
+    async def get_detailed(self, actions:Union[str, list], limit:int=50) -> dict:
+        """Coroutine which returns all attributes for an action/list of actions.
+
+        Args:
+            actions (str or int or list): Actions for which data will be returned.
+            limit (int, optional): Maximum number of concurrent requests. Defaults
+                to 50.
+
+        Returns:
+            Dict containing a dict object for each action queried.
+
+        """
+        actions = [actions] if type(actions) != list else actions
+        fetched = await _gather_many(self._get_detailed, actions, limit)
+        return { action: record for action, record in fetched if record is not None }
+
+    async def find_by_field(self, field:str, value:Union[str, int]) -> dict:
+        """Coroutine which returns all attributes for an action based on a field search.
+
+        See conquest_api.Action.find_by_field for details.
+
+        """
+        url = self.token.api_url+r"/api/action/find_by_field"
+        action_data = await _find_by_field(self.token, url, field, value)
+        return action_data
+
+    async def delete(self, actions:Union[str, list], limit:int=50) -> dict:
+        """Coroutine which deletes an action or list of actions by their action id.
+
+        Args:
+            actions (str or int or list): Actions to delete.
+            limit (int, optional): Maximum number of concurrent requests. Defaults
+                to 50.
+
+        Returns:
+            BulkResult (dict) with the action ids as keys, and the server
+            response as values. An empty dict corresponds with a successful
+            deletion. Actions the server failed to answer for (e.g. a 500 or a
+            timeout) are listed in its 'failed' attribute with the exception.
+
+        """
+        actions = [actions] if type(actions) != list else actions
+        deleted = conquest_api.BulkResult()
+        for action, (response, error) in await _gather_many(self._delete, actions, limit):
+            if error is None:
+                deleted[action] = response
+            else:
+                deleted.failed[action] = error
+        return deleted
+
+    async def _get_detailed(self, action:Union[str, int]) -> Union[dict, None]:
+        url = self.token.api_url+r"/api/Action/"+str(action)
+        response = await self.token.client.request("GET", url, token=self.token, allowed=(404,))
+        response = await _decode(response)
+        return None if "ErrorType" in response else response
+
+    async def _delete(self, action:Union[str, int]) -> Tuple:
+        # returns (response, None), or (None, exception) if the server failed to answer
+        url = self.token.api_url+r"/api/Action/"+str(action)
+        try:
+            response = await self.token.client.request("DELETE", url, token=self.token, allowed=conquest_api._refused_statuses)
+            text = await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            return None, error
+        return (conquest_api.get_json_codec().loads(text) if text != '' else {}), None
+
+
+class AsyncSystem(object):
+    def __init__(self, token:AsyncToken) -> None:
+        """Asyncio system class for accessing data relating to the system.
+
+        Args:
+            token (AsyncToken): AsyncToken object.
+
+        """
+        self.token = token
+
+    async def connections(self) -> list:
+        """Coroutine which returns a list of Conquest connections
+
+        """
+        return await self._get(r"/api/system/connections")
+
+    async def version(self) -> dict:
+        """Coroutine which returns a dict containing version details.
+
+        """
+        return await self._get(r"/api/system/version")
+
+    async def whoami(self) -> str:
+        """Coroutine which returns the a username as a string.
+
+        """
+        return await self._get(r"/api/system/whoami")
+
+    async def _get(self, path:str) -> Union[dict, list, str]:
+        response = await self.token.client.request("GET", self.token.api_url+path, token=self.token)
+        return await _decode(response)
+
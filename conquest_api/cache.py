@@ -0,0 +1,288 @@
+"""Response caches for the Conquest API Python Wrapper
+
+A cache is attached to a Client and is then used by every Asset and Action
+instance which shares that client. Lookups of assets and actions (by id or by
+find_by_field) are answered from the cache while the entry is fresh, and IDs
+which the server reported as not found are cached too (for a shorter time) so
+they aren't requested again and again. Deleting actions, and importing files,
+through the same client invalidates the affected entries.
+
+Entries are keyed by a tuple of (namespace, connection, item) where namespace
+is one of 'asset_detailed', 'asset_basic', 'asset_find', 'action_detailed' or
+'action_find', and item is the asset/action id, or 'field=value' for
+find_by_field lookups.
+
+Examples:
+    >>> from conquest_api.cache import LRUCache, SQLiteCache, TieredCache
+    >>> cache = TieredCache(LRUCache(maxsize=50000, ttl=300), SQLiteCache("conquest_cache.db", ttl=86400))
+    >>> token = conquest_api.Token(api_url, username, password, connection, client=conquest_api.Client(cache=cache))
+    >>> conquest_api.Asset(token).get_basic(116983)
+    >>> cache.stats()
+    {'hits': 0, 'misses': 1, 'negative_hits': 0, 'evictions': 0}
+
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, NoReturn, Tuple, Union
+
+MISS = object() #: returned by 'get' when a key is not cached (None is a cached 'not found')
+
+
+class CacheStats(object):
+    def __init__(self) -> None:
+        """Hit and miss counters kept by each cache.
+
+        Attributes:
+            hits (int): Lookups answered from the cache (including negative hits).
+            misses (int): Lookups which were not cached or had expired.
+            negative_hits (int): Lookups answered with a cached 'not found'.
+            evictions (int): Entries removed to keep the cache within its size.
+
+        """
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def record(self, value:Any) -> NoReturn:
+        with self._lock:
+            if value is MISS:
+                self.misses += 1
+            else:
+                self.hits += 1
+                if value is None:
+                    self.negative_hits += 1
+
+    def as_dict(self) -> dict:
+        return dict(hits=self.hits, misses=self.misses, negative_hits=self.negative_hits, evictions=self.evictions)
+
+
+class LRUCache(object):
+    def __init__(self, maxsize:int=10000, ttl:float=300, negative_ttl:float=60) -> None:
+        """In-memory cache with least recently used eviction and expiring entries.
+
+        Args:
+            maxsize (int, optional): Maximum number of entries. Defaults to 10000.
+            ttl (float, optional): Seconds a record stays fresh. Defaults to 300.
+            negative_ttl (float, optional): Seconds a 'not found' result stays
+                fresh. Defaults to 60.
+
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict() #: key -> (expiry time, value)
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def get(self, key:Tuple, default:Any=MISS) -> Any:
+        """Returns the cached value for a key, or 'default' if it isn't cached.
+
+        A cached value of None means the server reported the item as not found.
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        value = MISS if entry is None else entry[1]
+        self._stats.record(value)
+        return default if value is MISS else value
+
+    def set(self, key:Tuple, value:Any, ttl:Union[float, None]=None) -> NoReturn:
+        """Caches a value. A value of None caches a 'not found' result.
+
+        """
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic()+ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def invalidate(self, namespace:str, connection:str, item:Union[str, None]=None) -> NoReturn:
+        """Removes an entry, or every entry in a namespace if item is None.
+
+        """
+        with self._lock:
+            if item is not None:
+                self._entries.pop((namespace, connection, item), None)
+            else:
+                for key in [key for key in self._entries if key[:2] == (namespace, connection)]:
+                    del self._entries[key]
+
+    def clear(self) -> NoReturn:
+        """Removes every entry.
+
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Returns a dict of hit/miss statistics.
+
+        """
+        return self._stats.as_dict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(object):
+    def __init__(self, path:str, ttl:float=86400, negative_ttl:float=3600) -> None:
+        """Persistent cache stored in a SQLite database.
+
+        Entries outlive the process, so a cache file can be shared by
+        consecutive runs of a script. It is usually placed behind an LRUCache
+        using TieredCache.
+
+        Args:
+            path (str): Path of the database file (created if it doesn't exist).
+            ttl (float, optional): Seconds a record stays fresh. Defaults to 86400.
+            negative_ttl (float, optional): Seconds a 'not found' result stays
+                fresh. Defaults to 3600.
+
+        """
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("""CREATE TABLE IF NOT EXISTS cache (
+                                    namespace TEXT NOT NULL,
+                                    connection TEXT NOT NULL,
+                                    item TEXT NOT NULL,
+                                    expire REAL NOT NULL,
+                                    value TEXT,
+                                    PRIMARY KEY (namespace, connection, item))""")
+
+    def get(self, key:Tuple, default:Any=MISS) -> Any:
+        """Returns the cached value for a key, or 'default' if it isn't cached.
+
+        A cached value of None means the server reported the item as not found.
+
+        """
+        with self._lock:
+            row = self._db.execute("SELECT expire, value FROM cache WHERE namespace=? AND connection=? AND item=?", key).fetchone()
+        if row is None or row[0] < time.time():
+            value = MISS
+        else:
+            value = None if row[1] is None else json.loads(row[1])
+        self._stats.record(value)
+        return default if value is MISS else value
+
+    def set(self, key:Tuple, value:Any, ttl:Union[float, None]=None) -> NoReturn:
+        """Caches a value. A value of None caches a 'not found' result.
+
+        """
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        data = None if value is None else json.dumps(value)
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)", (*key, time.time()+ttl, data))
+
+    def invalidate(self, namespace:str, connection:str, item:Union[str, None]=None) -> NoReturn:
+        """Removes an entry, or every entry in a namespace if item is None.
+
+        """
+        with self._lock, self._db:
+            if item is not None:
+                self._db.execute("DELETE FROM cache WHERE namespace=? AND connection=? AND item=?", (namespace, connection, item))
+            else:
+                self._db.execute("DELETE FROM cache WHERE namespace=? AND connection=?", (namespace, connection))
+
+    def clear(self) -> NoReturn:
+        """Removes every entry.
+
+        """
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM cache")
+
+    def purge(self) -> NoReturn:
+        """Removes expired entries from the database.
+
+        """
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM cache WHERE expire < ?", (time.time(),))
+
+    def stats(self) -> dict:
+        """Returns a dict of hit/miss statistics.
+
+        """
+        return self._stats.as_dict()
+
+    def close(self) -> NoReturn:
+        """Closes the database.
+
+        """
+        self._db.close()
+
+
+class TieredCache(object):
+    def __init__(self, memory:LRUCache, persistent:SQLiteCache) -> None:
+        """Two level cache checking memory first and a persistent cache second.
+
+        Values found in the persistent tier are copied in to the memory tier.
+
+        Args:
+            memory (LRUCache): First tier.
+            persistent (SQLiteCache): Second tier.
+
+        """
+        self.memory = memory
+        self.persistent = persistent
+        self._stats = CacheStats()
+
+    def get(self, key:Tuple, default:Any=MISS) -> Any:
+        """Returns the cached value for a key, or 'default' if it isn't cached.
+
+        """
+        value = self.memory.get(key)
+        if value is MISS:
+            value = self.persistent.get(key)
+            if value is not MISS:
+                self.memory.set(key, value)
+        self._stats.record(value)
+        return default if value is MISS else value
+
+    def set(self, key:Tuple, value:Any, ttl:Union[float, None]=None) -> NoReturn:
+        """Caches a value in both tiers.
+
+        """
+        self.memory.set(key, value, ttl)
+        self.persistent.set(key, value, ttl)
+
+    def invalidate(self, namespace:str, connection:str, item:Union[str, None]=None) -> NoReturn:
+        """Removes an entry, or every entry in a namespace if item is None, from both tiers.
+
+        """
+        self.memory.invalidate(namespace, connection, item)
+        self.persistent.invalidate(namespace, connection, item)
+
+    def clear(self) -> NoReturn:
+        """Removes every entry from both tiers.
+
+        """
+        self.memory.clear()
+        self.persistent.clear()
+
+    def stats(self) -> dict:
+        """Returns a dict of hit/miss statistics, including those of each tier.
+
+        """
+        stats = self._stats.as_dict()
+        stats["memory"] = self.memory.stats()
+        stats["persistent"] = self.persistent.stats()
+        return stats
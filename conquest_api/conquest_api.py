@@ -13,7 +13,6 @@ Installation:
     pip install git+https://github.com/nwduncan/conquest_api.git
 
 To do:
-    Parse error CSV output correctly so that is doesn't split at commas in "strings".
     Implement further API functionality
 
 Author: Nathan Duncan
@@ -24,24 +23,711 @@ Version: 0.9
 import urllib.parse
 import json
 import csv
+import io
 import time
 import os
-import requests
+import contextlib
+import itertools
+import random
+import tempfile
+import threading
+from concurrent import futures
 from datetime import datetime as dt
 from datetime import timedelta
-from typing import NoReturn, Union
-
-# suppress the insecure request warnings
-from requests.packages.urllib3.exceptions import InsecureRequestWarning
-requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterable, Iterator, NoReturn, Tuple, Union
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+if TYPE_CHECKING:
+    # requests is imported by the first Client, which keeps importing this module fast
+    import requests
 
 # defaults
 verify = False
-output_path = os.environ['TEMP']
+output_path = None #: directory error CSVs are saved to, None uses the system temp directory
+json_codec = None #: codec used to decode responses, None uses the standard library (see JSONCodec)
+
+# helpers
+def get_output_path() -> str:
+    """Returns the directory error CSVs are saved to.
+
+    This is the module level 'output_path' if it has been set, otherwise the
+    system temp directory.
+
+    """
+    return tempfile.gettempdir() if output_path is None else output_path
+
+
+class JSONCodec(object):
+    """Reads and writes JSON using the standard library's json module.
+
+    A codec is any object with a 'loads' method, which is passed the bytes (or
+    str) of a response body, and a 'dumps' method, which returns a str. To use
+    another codec set the module level 'json_codec' variable, e.g.
+
+    >>> conquest_api.conquest_api.json_codec = conquest_api.OrjsonCodec()
+
+    """
+    def loads(self, data:Union[bytes, str]) -> object:
+        return json.loads(data)
+
+    def dumps(self, value:object) -> str:
+        return json.dumps(value)
+
+
+class OrjsonCodec(object):
+    def __init__(self) -> None:
+        """Reads and writes JSON using orjson, which is faster than the json module.
+
+        Responses are parsed straight from their bytes. orjson's decode errors
+        are json.JSONDecodeError subclasses, so they are handled the same way.
+
+        Raises:
+            ImportError: If orjson isn't installed (pip install orjson).
+
+        """
+        import orjson
+        self._orjson = orjson
+
+    def loads(self, data:Union[bytes, str]) -> object:
+        return self._orjson.loads(data)
+
+    def dumps(self, value:object) -> str:
+        return self._orjson.dumps(value, option=self._orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+
+_json_codec = JSONCodec()
+
+
+def get_json_codec() -> Union[JSONCodec, OrjsonCodec]:
+    """Returns the module level 'json_codec' if it has been set, otherwise a JSONCodec.
+
+    """
+    return _json_codec if json_codec is None else json_codec
+
+
+def _decode(response:"requests.Response") -> object:
+    # parses the body's bytes, skipping the decoded copy response.text would make
+    return get_json_codec().loads(response.content)
+
+
+def _fetch_many(fetch:Callable, items:Iterable, workers:int=1, ordered:bool=True) -> Iterator[Tuple]:
+    """Generator which calls 'fetch' for each item and yields (item, result) pairs.
+
+    With a single worker the items are fetched one at a time. Otherwise they are
+    fetched by a thread pool of the given size, with at most two requests per
+    worker queued at any time so that long (or lazy) item iterables are not
+    consumed all at once.
+
+    Args:
+        fetch (callable): Function called with a single item.
+        items (iterable): Items to fetch.
+        workers (int, optional): Number of worker threads. Defaults to 1.
+        ordered (bool, optional): Yield results in the same order as 'items'. If
+            False results are yielded as soon as each one completes.
+
+    """
+    if workers <= 1:
+        for item in items:
+            yield item, fetch(item)
+        return
+    items = iter(items)
+    pending = {}
+    with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit(count):
+            for item in itertools.islice(items, count):
+                pending[executor.submit(fetch, item)] = item
+        try:
+            submit(workers*2)
+            while pending:
+                if ordered:
+                    done = [next(iter(pending))]
+                    futures.wait(done)
+                else:
+                    done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    yield item, future.result()
+                submit(len(done))
+        finally:
+            # stop any queued requests if the generator is closed early
+            for future in pending:
+                future.cancel()
+
+
+def _cached(token:"Token", namespace:str, item:str, fetch:Callable) -> Union[dict, None]:
+    """Returns the result of fetch(), using the client's cache if it has one.
+
+    A result of None (not found) is cached as well. Concurrent lookups of the
+    same item share one call to fetch() if the client coalesces requests.
+
+    """
+    cache = token.client.cache
+    key = (namespace, token.connection, item)
+    if cache is not None:
+        value = cache.get(key, _miss)
+        if value is not _miss:
+            return value
+
+    def load():
+        value = fetch()
+        if cache is not None:
+            cache.set(key, value)
+        return value
+
+    single_flight = token.client.single_flight
+    return load() if single_flight is None else single_flight.do(key, load)
+
+
+def _invalidate(token:"Token", namespaces:Iterable[str], item:Union[str, None]=None) -> NoReturn:
+    """Removes an item (or whole namespaces if item is None) from the client's cache.
+
+    """
+    cache = token.client.cache
+    if cache is not None:
+        for namespace in namespaces:
+            cache.invalidate(namespace, token.connection, item)
+
+
+def _bulk(fetch:Callable, items:Iterable, workers:int=1, ordered:bool=True, result:Union["BulkResult", None]=None) -> Iterator[Tuple]:
+    """Generator which yields (item, record) for each item found by 'fetch'.
+
+    Items which 'fetch' reports as not found (None) are added to result.missing,
+    and items which could not be fetched are added to result.failed, if a
+    BulkResult is provided.
+
+    """
+    import requests
+
+    def attempt(item):
+        try:
+            return fetch(item), None
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as error:
+            return None, error
+
+    for item, (record, error) in _fetch_many(attempt, items, workers, ordered):
+        if record is not None:
+            yield item, record
+        elif result is None:
+            continue
+        elif error is None:
+            result.missing.append(item)
+        else:
+            result.failed[item] = error
+
+
+def _check(response:"requests.Response", allowed:Iterable[int]=(404,)) -> "requests.Response":
+    """Raises requests.HTTPError if the server was unable to answer a request.
+
+    Every error status is a failure, e.g. 401, 429 or 500, rather than an
+    answer, except those in 'allowed' which the caller handles itself (by
+    default 'not found'). Error bodies such as {"Message": "An error has
+    occurred."} are never returned as records.
+
+    """
+    if response.status_code >= 400 and response.status_code not in allowed:
+        response.raise_for_status()
+    return response
+
+
+def _body_positions(kwargs:dict) -> Union[list, None]:
+    """Returns (file, position) for each file in a request's body, so a retry can rewind them.
+
+    Returns None if the body can't be sent again, e.g. it is a generator or a
+    file which can't seek.
+
+    """
+    files = kwargs.get("files") or {}
+    bodies = [value[1] if isinstance(value, tuple) else value
+              for value in (files.values() if isinstance(files, dict) else (value for _, value in files))]
+    bodies.append(kwargs.get("data"))
+    positions = []
+    for body in bodies:
+        if body is None or isinstance(body, (str, bytes, dict, list, tuple)):
+            continue
+        try:
+            positions.append((body, body.tell()))
+        except (AttributeError, OSError, ValueError):
+            return None
+    return positions
+
+
+_miss = object()
+_transient_statuses = (429, 502, 503, 504)
+_refused_statuses = (400, 403, 404, 409) #: answers to a delete the server refused, e.g. not found
+_idempotent_methods = ("GET", "HEAD", "OPTIONS")
+# cache namespaces affected by each import type
+_import_namespaces = { "Asset": ("asset_detailed", "asset_basic", "asset_find"),
+                       "Action": ("action_detailed", "action_find") }
+
 
 # classes
+class BulkResult(dict):
+    def __init__(self) -> None:
+        """Dict of records returned by the bulk get methods.
+
+        This is a dict of {id: record} for every record found, which also keeps
+        track of the ids which weren't.
+
+        Attributes:
+            missing (list): Ids the server reported as not found.
+            failed (dict): Ids which could not be fetched (e.g. the server was
+                unavailable or the request timed out), with the exception raised.
+
+        """
+        super().__init__()
+        self.missing = []
+        self.failed = {}
+
+
+class SingleFlight(object):
+    def __init__(self) -> None:
+        """Shares the result of a call between threads making it at the same time.
+
+        The first thread to ask for a key makes the call, and any other thread
+        asking for the same key before it finishes waits for (and is given) the
+        same result or exception. Results are not kept once the call finishes.
+
+        Attributes:
+            shared (int): Number of calls answered by another thread's call.
+
+        """
+        self.shared = 0
+        self._calls = {} #: key -> Future of the call in flight
+        self._lock = threading.Lock()
+
+    def do(self, key:Tuple, fetch:Callable) -> object:
+        """Returns fetch(), or the result of the call in flight for the same key.
+
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                leader = False
+            else:
+                future = self._calls[key] = futures.Future()
+                leader = True
+        if not leader:
+            return future.result()
+        try:
+            value = fetch()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class TokenBucket(object):
+    def __init__(self, rate:float, burst:Union[int, None]=None) -> None:
+        """Token bucket rate limiter.
+
+        Used by Client to limit the rate at which requests are sent. Threads
+        calling 'acquire' wait until a token is available.
+
+        Args:
+            rate (float): Requests allowed per second.
+            burst (int or None, optional): Requests which may be sent at once
+                after a quiet period. Defaults to one second's worth.
+
+        """
+        self.rate = rate
+        self.burst = max(1, int(rate)) if burst is None else burst
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> NoReturn:
+        """Waits for, and takes, a token.
+
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens+(now-self._updated)*self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1-self._tokens)/self.rate
+            time.sleep(wait)
+
+
+class AdaptiveLimiter(object):
+    def __init__(self, maximum:int, minimum:int=1, decrease:float=0.5, cooldown:float=1.0) -> None:
+        """Concurrency limiter using additive increase/multiplicative decrease.
+
+        Used by Client to limit the number of requests in flight. The limit
+        starts at 'maximum'. Each overloaded response (429/503, or a timeout)
+        multiplies it by 'decrease', at most once per 'cooldown' seconds, and
+        each successful response raises it by 1/limit (roughly one per round of
+        requests) back towards 'maximum'.
+
+        Args:
+            maximum (int): Maximum number of requests in flight.
+            minimum (int, optional): Minimum number of requests in flight.
+                Defaults to 1.
+            decrease (float, optional): Multiplier applied to the limit when the
+                server is overloaded. Defaults to 0.5.
+            cooldown (float, optional): Seconds after a decrease before the limit
+                may be decreased again. Defaults to 1.0.
+
+        """
+        self.maximum = maximum
+        self.minimum = minimum
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self._decreased = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> NoReturn:
+        """Waits until a request may be sent.
+
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    def release(self, overloaded:bool=False) -> NoReturn:
+        """Marks a request as finished, adjusting the limit.
+
+        Args:
+            overloaded (bool, optional): True if the server signalled it was
+                overloaded.
+
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if overloaded:
+                if now-self._decreased >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit*self.decrease)
+                    self._decreased = now
+            else:
+                self.limit = min(self.maximum, self.limit+1/self.limit)
+            self._condition.notify_all()
+
+
+class Client(object):
+    def __init__(self, verify:Union[bool, str, None]=None, timeout:Union[float, tuple, None]=(10, 120), pool_size:int=10, cache=None,
+                 retries:int=3, backoff:float=0.5, rate_limit:Union[float, None]=None, max_concurrency:Union[int, None]=None,
+                 hooks:Union[dict, None]=None, coalesce:bool=True) -> None:
+        """HTTP client class shared by all other conquest_api classes.
+
+        A Client instance owns a single keep-alive requests.Session which is
+        reused for every call made to the API, so connections (and their TLS
+        sessions) are pooled rather than opened for each request. A Token
+        creates its own Client if one is not provided, and every class
+        initialised with that Token shares it.
+
+        Requests which fail with a connection error or timeout, or which the
+        server answers with 502, 503 or 504, are retried if they are idempotent
+        (GET requests). Rate limited (429) requests are retried whatever their
+        method, as the server has not processed them; uploaded files are
+        rewound first, and bodies which can't be rewound (e.g. generators) are
+        not retried. Retries wait for the server's Retry-After header if it
+        sent one, otherwise for a random (jittered) time which doubles with
+        each attempt.
+
+        Args:
+            verify (bool or str, optional): Whether to verify the server's TLS
+                certificate, or a path to a CA bundle. Defaults to the module
+                level 'verify' value.
+            timeout (float or tuple, optional): Timeout in seconds applied to each
+                request. A (connect, read) tuple may also be given. None waits
+                indefinitely. Defaults to (10, 120).
+            pool_size (int, optional): Maximum number of keep-alive connections
+                held open per host. Defaults to 10.
+            cache (optional): Cache used for asset and action lookups, e.g. a
+                conquest_api.cache.LRUCache. None (default) disables caching.
+            retries (int, optional): Number of times a failed request is retried.
+                Defaults to 3.
+            backoff (float, optional): Base wait in seconds between retries.
+                Defaults to 0.5.
+            rate_limit (float or None, optional): Maximum requests per second.
+                None (default) doesn't limit the rate.
+            max_concurrency (int or None, optional): Maximum requests in flight.
+                The limit adapts, backing off when the server reports it is
+                overloaded (429/503). None (default) doesn't limit concurrency.
+            hooks (dict or None, optional): Lists of callables keyed by hook name,
+                added to the client's 'hooks' attribute. See Notes.
+            coalesce (bool, optional): Share a single request between threads
+                looking up the same asset, action or field value at the same
+                time, rather than each sending its own. Defaults to True.
+
+        Notes:
+            The 'hooks' attribute is a dict of lists of callables, which can be
+            used for instrumentation (see conquest_api.metrics):
+                pre_request: called with an info dict (method, url, endpoint,
+                    attempt) before each request is sent, including retries.
+                post_request: called with the same info dict once a response
+                    (or error) is received, with status (None on error),
+                    elapsed (seconds) and error (exception or None) added.
+                event: called with a name and an info dict for other events:
+                    'retry' (endpoint, attempt, status), 'token' (grant,
+                    success) and 'import_phase' (phase, import_type, seconds,
+                    where phase is 'upload', 'poll' or 'error_csv').
+            Endpoints are url templates such as 'api/Asset/{id}'. When no
+            hooks are registered, the checks for them are the only cost.
+
+        Examples:
+            >>> client = conquest_api.Client(verify=True, timeout=(5, 60), pool_size=20)
+            >>> token = conquest_api.Token(api_url, username, password, connection, client=client)
+
+        """
+        self.verify = globals()["verify"] if verify is None else verify
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.cache = cache
+        self.retries = retries
+        self.backoff = backoff
+        self.rate_limiter = None if rate_limit is None else TokenBucket(rate_limit)
+        self.limiter = None if max_concurrency is None else AdaptiveLimiter(max_concurrency)
+        self.single_flight = SingleFlight() if coalesce else None
+        self.hooks = { "pre_request": [], "post_request": [], "event": [] }
+        for name, callables in (hooks or {}).items():
+            self.hooks[name].extend(callables)
+        import requests
+        if self.verify is False:
+            # only silence the warning once a client which doesn't verify is made
+            requests.packages.urllib3.disable_warnings(requests.packages.urllib3.exceptions.InsecureRequestWarning)
+        self._transient_errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method:str, url:str, token:Union["Token", None]=None, endpoint:Union[str, None]=None,
+                limited:bool=True, **kwargs) -> "requests.Response":
+        """Sends a request using the shared session.
+
+        Args:
+            method (str): HTTP method, e.g. 'GET'.
+            url (str): URL of the request.
+            token (Token or None, optional): If provided, the connection name and
+                bearer token headers are added to the request.
+            endpoint (str or None, optional): Url template passed to hooks, e.g.
+                'api/Asset/{id}'. Defaults to the url's path.
+            limited (bool, optional): Whether the request waits for the client's
+                rate and concurrency limits. Token requests are sent without
+                them, as they are made while another request holds a slot.
+                Defaults to True.
+            **kwargs: Passed through to requests.Session.request.
+
+        Returns:
+            A requests.Response object.
+
+        """
+        kwargs.setdefault("verify", self.verify)
+        kwargs.setdefault("timeout", self.timeout)
+        if token is not None:
+            kwargs["auth"] = TokenAuth(token)
+        idempotent = method.upper() in _idempotent_methods
+        positions = _body_positions(kwargs)
+        for attempt in range(self.retries+1):
+            response, error = self._send(method, url, endpoint, attempt, limited, kwargs)
+            if error is not None:
+                retry = idempotent
+            else:
+                retry = response.status_code == 429 or (idempotent and response.status_code in _transient_statuses)
+            # a body which was read by the last attempt, and can't be rewound, can't be sent again
+            if not retry or attempt == self.retries or positions is None:
+                break
+            for body, position in positions:
+                body.seek(position)
+            if response is not None:
+                response.close()
+            if self.hooks["event"]:
+                status = None if response is None else response.status_code
+                self.emit("retry", endpoint=endpoint or urllib.parse.urlsplit(url).path, attempt=attempt+1, status=status)
+            time.sleep(self._retry_wait(attempt, response))
+        if error is not None:
+            raise error
+        return response
+
+    def emit(self, name:str, **info) -> NoReturn:
+        """Calls each 'event' hook with an event name and info dict.
+
+        """
+        for hook in self.hooks["event"]:
+            hook(name, info)
+
+    def _send(self, method:str, url:str, endpoint:Union[str, None], attempt:int, limited:bool, kwargs:dict) -> Tuple:
+        # returns (response, None), or (None, exception) for connection errors and timeouts
+        limiter = self.limiter if limited else None
+        if limited and self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        if limiter is not None:
+            limiter.acquire()
+        info = None
+        if self.hooks["pre_request"] or self.hooks["post_request"]:
+            info = dict(method=method, url=url, endpoint=endpoint or urllib.parse.urlsplit(url).path, attempt=attempt)
+            for hook in self.hooks["pre_request"]:
+                hook(info)
+            start = time.perf_counter()
+        response = error = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except self._transient_errors as exception:
+            error = exception
+        except Exception as exception:
+            error = exception
+            raise
+        finally:
+            if limiter is not None:
+                overloaded = response is None or response.status_code in (429, 503)
+                limiter.release(overloaded)
+            if info is not None:
+                info.update(status=None if response is None else response.status_code,
+                            elapsed=time.perf_counter()-start, error=error)
+                for hook in self.hooks["post_request"]:
+                    hook(info)
+        return response, error
+
+    def _retry_wait(self, attempt:int, response:Union["requests.Response", None]) -> float:
+        retry_after = None if response is None else response.headers.get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        return random.uniform(0, self.backoff*2**attempt)
+
+    def close(self) -> NoReturn:
+        """Closes the session and any pooled connections.
+
+        """
+        self.session.close()
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *args) -> NoReturn:
+        self.close()
+
+
+class TokenAuth(object):
+    def __init__(self, token:"Token") -> None:
+        """Request auth callable which adds the Conquest headers to a request.
+
+        Used internally by Client.request. The token is requested when the
+        request is prepared so that an expired token is refreshed first.
+
+        Args:
+            token (Token): Token object.
+
+        """
+        self.token = token
+
+    def __call__(self, request):
+        request.headers["X-ConnectionName"] = self.token.connection
+        request.headers["Authorization"] = "bearer "+self.token.get_token()
+        return request
+
+
+class TokenStore(object):
+    def __init__(self, path:Union[str, None]=None) -> None:
+        """On-disk token cache which can be shared by processes.
+
+        Tokens are saved to a JSON file keyed by API url, connection and
+        username, so that short lived scripts can reuse a token (and its
+        refresh token) generated by an earlier process instead of requesting a
+        new one. Reads and writes are serialised between processes with a lock
+        file. Tokens are stored in plain text, so the file is created readable
+        by its owner only.
+
+        Args:
+            path (str or None, optional): Path of the token file. Defaults to
+                '.conquest_api/tokens.json' in the user's home directory.
+
+        Examples:
+            >>> store = conquest_api.TokenStore()
+            >>> token = conquest_api.Token(api_url, username, password, connection, store=store)
+
+        """
+        if path is None:
+            path = os.path.join(os.path.expanduser("~"), ".conquest_api", "tokens.json")
+        self.path = path
+        self._lock_path = path+".lock"
+
+    @staticmethod
+    def key(api_url:str, connection:str, username:str) -> str:
+        """Returns the key a token is stored under.
+
+        """
+        return "|".join((api_url, connection, username))
+
+    @contextlib.contextmanager
+    def lock(self) -> Iterator[None]:
+        """Context manager which holds an exclusive lock on the token file.
+
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self._lock_path, "a+b") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    # LK_LOCK gives up after 10 seconds
+                    except OSError:
+                        pass
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def load(self, key:str) -> Union[dict, None]:
+        """Returns the stored entry for a key, or None if there isn't one.
+
+        Entries are dicts containing 'token', 'refresh_token' and 'expire' (a
+        POSIX timestamp). Callers should hold the lock.
+
+        """
+        try:
+            with open(self.path, "r") as open_file:
+                return json.load(open_file).get(key)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, key:str, entry:Union[dict, None]) -> NoReturn:
+        """Saves (or with an entry of None, removes) the entry for a key.
+
+        Callers should hold the lock.
+
+        """
+        try:
+            with open(self.path, "r") as open_file:
+                entries = json.load(open_file)
+        except (OSError, ValueError):
+            entries = {}
+        if entry is None:
+            entries.pop(key, None)
+        else:
+            entries[key] = entry
+        temp_path = self.path+".tmp"
+        descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w") as open_file:
+            json.dump(entries, open_file)
+        os.replace(temp_path, self.path)
+
+
 class Token(object):
-    def __init__(self, api_url:str, username:str, password:str, connection:str) -> None:
+    def __init__(self, api_url:str, username:str, password:str, connection:str, client:Union[Client, None]=None,
+                 store:Union[TokenStore, None]=None, refresh_margin:int=180, auto_refresh:bool=False) -> None:
         """Token handling class.
 
         This class generates an access token which is needed to interact with the API.
@@ -54,16 +740,33 @@ class Token(object):
             username (str): Username to be used for generating a token.
             password (str): Password to be used for generating a token.
             connection (str): Name of the Conquest connection to generate a token for.
+            client (Client or None, optional): Client used to send requests. A new
+                Client is created if one is not provided. Every class initialised
+                with this token sends its requests through this client.
+            store (TokenStore or None, optional): If provided, tokens are loaded
+                from and saved to this store so they can be reused by other
+                processes.
+            refresh_margin (int, optional): The token is refreshed when it is due
+                to expire within this many seconds. Defaults to 180.
+            auto_refresh (bool, optional): Refresh the token in a background
+                thread before it reaches the refresh margin, so that requests
+                never wait on a refresh. Defaults to False.
 
         """
+        self.client = Client() if client is None else client
         self.api_url = api_url
         self.token_url = api_url+"api/token"
         self.connection = connection
         self.username = username
         self.password = password
+        self.store = store
+        self.refresh_margin = refresh_margin
+        self.auto_refresh = auto_refresh
         self.expire = None #: datetime object pointing to time of token expiration
         self.token = None #: str representing the token
         self.refresh_token = None #: str representing the refresh token code
+        self._lock = threading.RLock()
+        self._timer = None
 
     def get_token(self) -> str:
         """Generate token method.
@@ -74,45 +777,119 @@ class Token(object):
         previously created token. If a token is unable to be generated, a ValueError
         is raised which includes the error messages from the server.
 
+        This method is thread safe. When several threads find the token missing
+        or expired, one of them requests a new token while the others wait for
+        it, so a refresh token is never used twice.
+
         """
-        # if no token exists, generate it
-        if self.token is None:
-            headers = { "X-ConnectionName": self.connection,
-                        "Accept": "application/json" }
-            payload = { "grant_type": "password",
-                        "username": self.username,
-                        "password": self.password }
-            response = requests.post(self.token_url, data=urllib.parse.urlencode(payload), headers=headers, verify=verify)
-            response = json.loads(response.text)
-            try:
-                self.token = response["access_token"]
-                self.refresh_token = response["refresh_token"]
-                self.expire = dt.now()+timedelta(seconds=response["expires_in"])
-                return self.token
-            # error is raised if token generation was unsuccesful
-            except KeyError:
-                raise ValueError(f"Unable to generate access token - {response['error']}: {response['error_description']}")
-        # if the token is still valid, return it
-        elif (dt.now() - timedelta(seconds=180)) < self.expire:
-            return self.token
-        # otherwise generate a new token using the refresh token
-        else:
-            self.refresh()
+        with self._lock:
+            if not self.valid():
+                self._acquire()
             return self.token
 
+    def valid(self) -> bool:
+        """Returns True if the token exists and is not within the refresh margin.
+
+        """
+        return self.token is not None and dt.now()+timedelta(seconds=self.refresh_margin) < self.expire
+
     def refresh(self) -> NoReturn:
         """The refresh method refreshes the token using the refresh_token code.
 
+        If the refresh token is rejected (e.g. it has already been used) a new
+        token is generated with the provided credentials instead.
+
+        """
+        with self._lock:
+            self._acquire(force=True)
+
+    def close(self) -> NoReturn:
+        """Stops the background refresh thread, if one is running.
+
         """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _acquire(self, force:bool=False) -> NoReturn:
+        if self.store is None:
+            self._update(force)
+            return
+        key = self.store.key(self.api_url, self.connection, self.username)
+        with self.store.lock():
+            # another process may have already generated (or refreshed) a token
+            entry = self.store.load(key)
+            if entry is not None and entry["token"] != self.token:
+                self._set_token(entry["token"], entry["refresh_token"], dt.fromtimestamp(entry["expire"]))
+                if self.valid() and not force:
+                    return
+            self._update(force)
+            self.store.save(key, { "token": self.token,
+                                   "refresh_token": self.refresh_token,
+                                   "expire": self.expire.timestamp() })
+
+    def _update(self, force:bool) -> NoReturn:
+        # generate a new token using the refresh token, falling back to the credentials
+        if self.refresh_token is not None and (force or not self.valid()):
+            payload = { "grant_type": "refresh_token",
+                        "refresh_token": self.refresh_token }
+            response = self._request_token(payload)
+            self._emit("refresh_token", "access_token" in response)
+            if "access_token" in response:
+                self._set_response(response)
+                return
+        payload = { "grant_type": "password",
+                    "username": self.username,
+                    "password": self.password }
+        response = self._request_token(payload)
+        self._emit("password", "access_token" in response)
+        try:
+            self._set_response(response)
+        # error is raised if token generation was unsuccesful
+        except KeyError:
+            raise ValueError(f"Unable to generate access token - {response['error']}: {response['error_description']}")
+
+    def _emit(self, grant:str, success:bool) -> NoReturn:
+        if self.client.hooks["event"]:
+            self.client.emit("token", grant=grant, success=success)
+
+    def _request_token(self, payload:dict) -> dict:
         headers = { "X-ConnectionName": self.connection,
                     "Accept": "application/json" }
-        payload = { "grant_type": "refresh_token",
-                    "refresh_token": self.refresh_token }
-        response = requests.post(self.token_url, data=urllib.parse.urlencode(payload), headers=headers, verify=verify)
-        response = json.loads(response.text)
-        self.token = response["access_token"]
-        self.refresh_token = response["refresh_token"]
-        self.expire = dt.now()+timedelta(seconds=response["expires_in"])
+        response = self.client.request("POST", self.token_url, endpoint="api/token", limited=False,
+                                       data=urllib.parse.urlencode(payload), headers=headers)
+        # rejected credentials and refresh tokens are answered with an error body
+        _check(response, allowed=(400, 401))
+        return _decode(response)
+
+    def _set_response(self, response:dict) -> NoReturn:
+        expire = dt.now()+timedelta(seconds=response["expires_in"])
+        self._set_token(response["access_token"], response["refresh_token"], expire)
+
+    def _set_token(self, token:str, refresh_token:str, expire:dt) -> NoReturn:
+        self.token = token
+        self.refresh_token = refresh_token
+        self.expire = expire
+        if self.auto_refresh:
+            self._schedule()
+
+    def _schedule(self) -> NoReturn:
+        # refresh well before the margin is reached so callers never have to wait
+        if self._timer is not None:
+            self._timer.cancel()
+        remaining = (self.expire-dt.now()).total_seconds()-self.refresh_margin
+        delay = max(remaining-self.refresh_margin, remaining/2, 1)
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self) -> NoReturn:
+        try:
+            self.refresh()
+        # the next call to get_token will try again
+        except Exception:
+            pass
 
 
 class Import(object):
@@ -143,7 +920,7 @@ class Import(object):
         self.token = token
         self.import_types = ["Action", "Asset", "Defect", "Request", "AssetInspection", "RiskEvent", "LogBook"]
 
-    def add(self, filename:str, import_type:str) -> dict:
+    def add(self, filename:str, import_type:str, poll_interval:float=0.1, max_interval:float=2.0) -> dict:
         """A method for importing files in to Conquest.
 
         This method returns a dict containing a boolean representing the success
@@ -155,6 +932,11 @@ class Import(object):
             filename (str): Path fo the file to be imported in to Conquest
             import_type (str): Type of import to be attempted. See self.import_types
                 or the API documentation for a list of valid import types.
+            poll_interval (float, optional): Seconds to wait before the first
+                repeat check of the import state. The wait grows by half each time
+                the batch is still processing. Defaults to 0.1.
+            max_interval (float, optional): Longest wait in seconds between checks
+                of the import state. Defaults to 2.0.
 
         Returns:
             A dict containing the batch id (str), attempt successfulness (bool),
@@ -163,32 +945,140 @@ class Import(object):
         """
         # make sure we have a valid import type
         if import_type in self.import_types:
-            with open(filename, "rb") as open_file:
-                url = self.token.api_url+"api/import/add/"+str(import_type)
-                headers = { "X-ConnectionName": self.token.connection,
-                            "Authorization": "bearer "+self.token.get_token() }
-                files = { "files": open_file }
-                response = requests.post(url, files=files, headers=headers, verify=verify)
-                batch = json.loads(response.content.decode("utf-8"))
-                while True:
-                    status = self.get_state(batch)
-                    # wait
-                    if status["Status"] == "Processing":
-                        time.sleep(0.1)
-                    # success
-                    elif status["Status"] == "Completed":
-                        return self.result(batch, True)
-                    # error
-                    else:
-                        if "Output to CSV" in status["Error"]:
-                            error_csv = self.output_to_csv(batch, filename)
-                        else:
-                            error_csv = None
-                        return self.result(batch, False, status["Error"], error_csv)
+            batch = self.upload(filename, import_type)
+            status = self.wait(batch, poll_interval, max_interval, import_type)
+            return self.finish(batch, filename, status, import_type)
 
         else:
             return self.result(None, False, f"Import type of {import_type} is not a valid option.", None)
 
+    def upload(self, filename:str, import_type:str) -> str:
+        """A method for uploading a file to be imported without waiting for it.
+
+        This is used internally by the 'add' method and by ImportQueue. The
+        import type is not checked.
+
+        Args:
+            filename (str): Path fo the file to be imported in to Conquest
+            import_type (str): Type of import to be attempted.
+
+        Returns:
+            Id (str) of the batch created by the server.
+
+        """
+        with open(filename, "rb") as open_file:
+            return self.upload_file(open_file, import_type, os.path.basename(filename))
+
+    def upload_file(self, open_file:BinaryIO, import_type:str, name:str) -> str:
+        """A method for uploading an open (binary) file object to be imported.
+
+        See 'upload' for details.
+
+        Args:
+            open_file (file): File object, positioned at the start of the data.
+            import_type (str): Type of import to be attempted.
+            name (str): Filename sent to the server, e.g. 'import.csv'.
+
+        Returns:
+            Id (str) of the batch created by the server.
+
+        """
+        start = time.perf_counter()
+        url = self.token.api_url+"api/import/add/"+str(import_type)
+        files = { "files": (name, open_file) }
+        response = _check(self.token.client.request("POST", url, token=self.token, endpoint="api/import/add/{type}", files=files), ())
+        batch = _decode(response)
+        self.phase("upload", import_type, start)
+        return batch
+
+    def wait(self, batch:str, poll_interval:float=0.1, max_interval:float=2.0, import_type:Union[str, None]=None) -> dict:
+        """A method which waits for a batch to finish processing.
+
+        The wait between checks of the batch's state starts at 'poll_interval'
+        and grows by half each time the batch is still processing, up to
+        'max_interval'.
+
+        Args:
+            batch (str): Id of the batch to wait for.
+            poll_interval (float, optional): Seconds to wait before the first
+                repeat check. Defaults to 0.1.
+            max_interval (float, optional): Longest wait in seconds between
+                checks. Defaults to 2.0.
+            import_type (str or None, optional): Type of import, passed to the
+                client's 'import_phase' event hooks.
+
+        Returns:
+            The final response from the 'get_state' method (dict).
+
+        """
+        start = time.perf_counter()
+        interval = poll_interval
+        while True:
+            status = self.get_state(batch)
+            if status["Status"] != "Processing":
+                self.phase("poll", import_type, start)
+                return status
+            time.sleep(interval)
+            interval = min(interval*1.5, max_interval)
+
+    def finish(self, batch:str, filename:str, status:dict, import_type:Union[str, None]=None) -> dict:
+        """A method for building the result of a batch which is no longer processing.
+
+        If the server reports errors which can be output to CSV, the error CSV
+        is downloaded. If the client has a cache, cached records of the imported
+        type are invalidated (even for a failed batch, as some rows may still
+        have been imported). This is used internally by the 'add' method and by
+        ImportQueue.
+
+        Args:
+            batch (str): Id of the batch.
+            filename (str): Filename of the file which attempted an import.
+            status (dict): Response from the 'get_state' method.
+            import_type (str or None, optional): Type of import attempted.
+
+        Returns:
+            Dict built using the 'result' method.
+
+        """
+        self.invalidate(import_type)
+        # success
+        if status["Status"] == "Completed":
+            return self.result(batch, True)
+        # error
+        if "Output to CSV" in status["Error"]:
+            start = time.perf_counter()
+            error_csv = self.output_to_csv(batch, filename)
+            self.phase("error_csv", import_type, start)
+        else:
+            error_csv = None
+        return self.result(batch, False, status["Error"], error_csv)
+
+    def invalidate(self, import_type:Union[str, None]) -> NoReturn:
+        """Removes cached records which an import of the given type may have changed.
+
+        Does nothing if the client has no cache. This is used internally.
+
+        Args:
+            import_type (str or None): Type of import attempted.
+
+        """
+        _invalidate(self.token, _import_namespaces.get(import_type, ()))
+
+    def phase(self, phase:str, import_type:Union[str, None], start:float) -> NoReturn:
+        """Emits an 'import_phase' event for a phase which began at 'start'.
+
+        Does nothing if the client has no event hooks. This is used internally.
+
+        Args:
+            phase (str): 'upload', 'poll' or 'error_csv'.
+            import_type (str or None): Type of import attempted.
+            start (float): time.perf_counter() value when the phase began.
+
+        """
+        client = self.token.client
+        if client.hooks["event"]:
+            client.emit("import_phase", phase=phase, import_type=import_type, seconds=time.perf_counter()-start)
+
     def get_state(self, batch:str) -> dict:
         """A method for getting the state of a batch.
 
@@ -203,15 +1093,16 @@ class Import(object):
 
         """
         url = self.token.api_url+r"api/import/state/"+batch
-        headers = { "X-ConnectionName": self.token.connection,
-                    "Authorization": "bearer "+self.token.get_token() }
-        response = requests.get(url, headers=headers, verify=verify)
-        response = json.loads(response.text)
+        response = _check(self.token.client.request("GET", url, token=self.token, endpoint="api/import/state/{batch}"), ())
+        response = _decode(response)
         return response
 
     def output_to_csv(self, batch:str, filename:str) -> str:
         """The method used to 'Output to CSV' when an error is found during an import.
 
+        The error CSV is streamed from the server and written to the output path
+        a row at a time, so large error files are never held in memory.
+
         Args:
             batch (str): Batch id of the item with errors to output.
             filename (str): Filename of the file which attempted an import.
@@ -220,18 +1111,41 @@ class Import(object):
             Filename (str) of the error CSV.
 
         """
-        url = self.token.api_url+r"/api/import/error_csv/"+batch
-        headers = { "X-ConnectionName": self.token.connection,
-                    "Authorization": "bearer "+self.token.get_token() }
-        response = requests.get(url, headers=headers, verify=verify)
         name, ext = os.path.splitext(os.path.basename(filename))
-        out_filename = os.path.join(output_path, name+"_ERROR"+ext)
-        with open(out_filename, "w", newline="") as open_file:
-            err_wr = csv.writer(open_file)
-            for row in response.content.decode("utf-8").split("\r\n"):
-                err_wr.writerow(row.split(","))
+        out_filename = os.path.join(get_output_path(), name+"_ERROR"+ext)
+        with self._open_error_csv(batch) as error_csv:
+            with open(out_filename, "w", newline="", encoding="utf-8") as open_file:
+                err_wr = csv.writer(open_file)
+                err_wr.writerows(csv.reader(error_csv))
         return out_filename
 
+    def iter_errors(self, batch:str) -> Iterator[dict]:
+        """Generator which yields each row of a batch's error CSV.
+
+        The error CSV is streamed from the server and parsed as it arrives,
+        without writing a file.
+
+        Args:
+            batch (str): Batch id of the item with errors.
+
+        Yields:
+            A dict for each row of the error CSV, keyed by the CSV's headers.
+
+        """
+        with self._open_error_csv(batch) as error_csv:
+            for row in csv.DictReader(error_csv):
+                yield row
+
+    @contextlib.contextmanager
+    def _open_error_csv(self, batch:str) -> Iterator[io.TextIOWrapper]:
+        url = self.token.api_url+r"/api/import/error_csv/"+batch
+        with self.token.client.request("GET", url, token=self.token, endpoint="api/import/error_csv/{batch}", stream=True) as response:
+            _check(response, ())
+            response.raw.decode_content = True
+            # let the text wrapper (rather than urllib3) decide when the stream is finished
+            response.raw.auto_close = False
+            yield io.TextIOWrapper(response.raw, encoding="utf-8-sig", newline="")
+
     def result(self, batch:Union[str, None], success:bool, error_msg:Union[str, None]=None, error_file:Union[str, None]=None) -> dict:
         """Returns a dict containing details about an import process.
 
@@ -258,6 +1172,240 @@ class Import(object):
         return result
 
 
+class ImportHandle(object):
+    def __init__(self, filename:str, import_type:str) -> None:
+        """Handle to a file submitted to an ImportQueue.
+
+        Handles are returned by ImportQueue.submit straight away, before the file
+        has been uploaded.
+
+        Args:
+            filename (str): Path of the file being imported.
+            import_type (str): Type of import being attempted.
+
+        Attributes:
+            batch (str or None): Batch id, set once the file has been uploaded.
+
+        """
+        self.filename = filename
+        self.import_type = import_type
+        self.batch = None
+        self._uploaded = None #: time.perf_counter() value when the upload finished
+        self._future = futures.Future()
+
+    def done(self) -> bool:
+        """Returns True once the import has finished (successfully or not).
+
+        """
+        return self._future.done()
+
+    def result(self, timeout:Union[float, None]=None) -> dict:
+        """Waits for the import to finish and returns its result.
+
+        Args:
+            timeout (float or None, optional): Seconds to wait before raising a
+                TimeoutError. None (default) waits indefinitely.
+
+        Returns:
+            The same dict returned by Import.add. If the upload itself failed the
+            exception is raised here instead, and if the queue was closed
+            without waiting a CancelledError is raised.
+
+        """
+        return self._future.result(timeout)
+
+    def __repr__(self) -> str:
+        return f"<ImportHandle {self.filename!r} batch={self.batch!r} done={self.done()}>"
+
+
+class ImportQueue(object):
+    def __init__(self, token:Token, workers:int=4, poll_interval:float=0.1, max_interval:float=5.0, backoff:float=2.0) -> None:
+        """Queue used to import many files in to Conquest at once.
+
+        Files submitted to the queue are uploaded concurrently by a pool of
+        worker threads and a handle is returned immediately. A single poller
+        thread then tracks the state of every outstanding batch. Each batch is
+        checked after 'poll_interval' seconds, and the wait is multiplied by
+        'backoff' (up to 'max_interval') every time it is still processing, so
+        long running batches are checked rarely while short ones finish quickly.
+
+        Args:
+            token (Token): Token object
+            workers (int, optional): Number of files uploaded (and error CSVs
+                downloaded) at once. Defaults to 4.
+            poll_interval (float, optional): Seconds to wait before the first
+                check of a batch's state. Defaults to 0.1.
+            max_interval (float, optional): Longest wait in seconds between
+                checks of a batch's state. Defaults to 5.0.
+            backoff (float, optional): Multiplier applied to the wait after each
+                check which finds the batch still processing. Defaults to 2.0.
+
+        Examples:
+            >>> with conquest_api.ImportQueue(token) as queue:
+            ...     handles = [queue.submit(filename, 'Asset') for filename in batch_files]
+            ...     for handle in queue.as_completed(handles):
+            ...         print(handle.filename, handle.result())
+
+        """
+        self.importer = Import(token)
+        self.poll_interval = poll_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._executor = futures.ThreadPoolExecutor(max_workers=workers)
+        self._outstanding = {} #: handle -> [time of next check, current wait]
+        self._condition = threading.Condition()
+        self._poller = None
+        self._pending = 0 #: number of submitted imports which have not finished
+        self._handles = {} #: future -> handle of each submitted import which has not finished
+        self._closed = False
+
+    def submit(self, filename:str, import_type:str) -> ImportHandle:
+        """Submits a file to be imported and returns its handle without waiting.
+
+        Args:
+            filename (str): Path fo the file to be imported in to Conquest
+            import_type (str): Type of import to be attempted. See
+                Import.import_types for a list of valid import types.
+
+        Returns:
+            An ImportHandle.
+
+        Raises:
+            RuntimeError: If the queue has been closed.
+
+        """
+        handle = ImportHandle(filename, import_type)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Cannot submit to a closed ImportQueue.")
+            if import_type not in self.importer.import_types:
+                handle._future.set_result(self.importer.result(None, False, f"Import type of {import_type} is not a valid option.", None))
+                return handle
+            self._pending += 1
+            self._handles[handle._future] = handle
+            self._executor.submit(self._upload, handle)
+        handle._future.add_done_callback(self._done)
+        return handle
+
+    def as_completed(self, handles:Iterable[ImportHandle], timeout:Union[float, None]=None) -> Iterator[ImportHandle]:
+        """Generator which yields each handle as its import finishes.
+
+        Args:
+            handles (iterable): Handles returned by 'submit'.
+            timeout (float or None, optional): Seconds to wait for all imports
+                before raising a TimeoutError. None (default) waits indefinitely.
+
+        Yields:
+            ImportHandle objects in the order they finish.
+
+        """
+        handles = { handle._future: handle for handle in handles }
+        for future in futures.as_completed(handles, timeout):
+            yield handles[future]
+
+    def close(self, wait:bool=True) -> NoReturn:
+        """Stops the queue's threads.
+
+        Args:
+            wait (bool, optional): Wait for outstanding imports to finish first.
+                Defaults to True. Otherwise imports which haven't finished are
+                cancelled, so their handles don't wait for a result which will
+                never come (batches already uploaded are still processed by the
+                server) and queued uploads are not sent.
+
+        """
+        with self._condition:
+            if wait:
+                self._condition.wait_for(lambda: self._pending == 0)
+            self._closed = True
+            handles = list(self._handles.values())
+            self._condition.notify_all()
+        for handle in handles:
+            handle._future.cancel()
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "ImportQueue":
+        return self
+
+    def __exit__(self, *args) -> NoReturn:
+        self.close()
+
+    def _upload(self, handle:ImportHandle) -> NoReturn:
+        if handle._future.cancelled():
+            return
+        try:
+            handle.batch = self.importer.upload(handle.filename, handle.import_type)
+        except Exception as error:
+            self._resolve(handle, error=error)
+            return
+        handle._uploaded = time.perf_counter()
+        with self._condition:
+            if self._closed:
+                return
+            self._outstanding[handle] = [time.monotonic()+self.poll_interval, self.poll_interval]
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name="ImportQueue-poller", daemon=True)
+                self._poller.start()
+            self._condition.notify_all()
+
+    def _done(self, future:futures.Future) -> NoReturn:
+        with self._condition:
+            self._pending -= 1
+            self._handles.pop(future, None)
+            self._condition.notify_all()
+
+    def _finish(self, handle:ImportHandle, status:dict) -> NoReturn:
+        try:
+            result = self.importer.finish(handle.batch, handle.filename, status, handle.import_type)
+        except Exception as error:
+            self._resolve(handle, error=error)
+        else:
+            self._resolve(handle, result)
+
+    def _resolve(self, handle:ImportHandle, result:Union[dict, None]=None, error:Union[Exception, None]=None) -> NoReturn:
+        # sets the handle's result, unless close(wait=False) has already cancelled it
+        try:
+            if error is None:
+                handle._future.set_result(result)
+            else:
+                handle._future.set_exception(error)
+        except futures.InvalidStateError:
+            pass
+
+    def _poll(self) -> NoReturn:
+        while True:
+            with self._condition:
+                # sleep until the next batch is due to be checked
+                while True:
+                    if self._closed:
+                        return
+                    now = time.monotonic()
+                    due = [handle for handle, (next_check, _) in self._outstanding.items() if next_check <= now]
+                    if due:
+                        break
+                    waits = [next_check-now for next_check, _ in self._outstanding.values()]
+                    self._condition.wait(min(waits) if waits else None)
+            for handle in due:
+                try:
+                    status = self.importer.get_state(handle.batch)
+                except Exception as error:
+                    status = None
+                    self._resolve(handle, error=error)
+                with self._condition:
+                    if status is not None and status["Status"] == "Processing":
+                        wait = min(self._outstanding[handle][1]*self.backoff, self.max_interval)
+                        self._outstanding[handle] = [time.monotonic()+wait, wait]
+                        continue
+                    del self._outstanding[handle]
+                if status is not None:
+                    self.importer.phase("poll", handle.import_type, handle._uploaded)
+                    try:
+                        self._executor.submit(self._finish, handle, status)
+                    except RuntimeError:
+                        # the queue was closed without waiting, which cancelled the handle
+                        return
+
+
 class Asset(object):
     def __init__(self, token:Token) -> None:
         """Asset class for accessing data relating to assets.
@@ -274,6 +1422,10 @@ class Asset(object):
             is not found (i.e. no asset exists with that AssetID) then the return
             object will not contain any reference to that asset.
 
+            The get and iter methods accept a 'workers' argument to fetch assets
+            concurrently. Keep this at or below the pool_size of the token's Client,
+            otherwise connections beyond the pool size are not kept alive.
+
         Examples:
             See https://github.com/nwduncan/conquest_api.git for examples on using
             this class.
@@ -281,49 +1433,98 @@ class Asset(object):
         """
         self.token = token
 
-    def get_detailed(self, assets:Union[str, int, list]) -> dict:
+    def get_detailed(self, assets:Union[str, int, list], workers:int=1) -> dict:
         """Method which returns all attributes for an asset/list of assets.
 
         Args:
             assets (str or int or list): Assets for which data will be returned.
+            workers (int, optional): Number of assets to fetch concurrently.
+                Defaults to 1 (one at a time).
 
         Returns:
-            Dict containing a dict object for each asset queried.
+            BulkResult (dict) containing a dict object for each asset found. Ids
+            which weren't found, or which couldn't be fetched, are listed in its
+            'missing' and 'failed' attributes.
 
         """
         assets = [assets] if type(assets) != list else assets
-        asset_data = {}
-        for asset in assets:
-            url = self.token.api_url+r"/api/Asset/"+str(asset)
-            headers = { "X-ConnectionName": self.token.connection,
-                        "Authorization": "bearer "+self.token.get_token() }
-            response = requests.get(url, headers=headers, verify=verify)
-            response = json.loads(response.text)
-            if "ErrorType" not in response:
-                asset_data[asset] = response
-        return asset_data
-
-    def get_basic(self, assets:Union[str, int, list]) -> dict:
+        result = BulkResult()
+        result.update(_bulk(self._get_detailed, assets, workers, result=result))
+        return result
+
+    def get_basic(self, assets:Union[str, int, list], workers:int=1) -> dict:
         """Method which returns basic attributes for an asset/list of assets.
 
         Args:
             assets (str or int or list): Assets for which data will be returned.
+            workers (int, optional): Number of assets to fetch concurrently.
+                Defaults to 1 (one at a time).
 
         Returns:
-            Dict containing a dict object for each asset queried.
+            BulkResult (dict) containing a dict object for each asset found. Ids
+            which weren't found, or which couldn't be fetched, are listed in its
+            'missing' and 'failed' attributes.
 
         """
         assets = [assets] if type(assets) != list else assets
-        asset_data = {}
-        for asset in assets:
-            url = self.token.api_url+r"/api/Asset/basic/"+str(asset)
-            headers = { "X-ConnectionName": self.token.connection,
-                        "Authorization": "bearer "+self.token.get_token() }
-            response = requests.get(url, headers=headers, verify=verify)
-            response = json.loads(response.text)
-            if "ErrorType" not in response:
-                asset_data[asset] = response
-        return asset_data
+        result = BulkResult()
+        result.update(_bulk(self._get_basic, assets, workers, result=result))
+        return result
+
+    def iter_detailed(self, assets:Union[str, int, Iterable], workers:int=8, result:Union[BulkResult, None]=None) -> Iterator[Tuple]:
+        """Generator which yields all attributes for each asset as it is fetched.
+
+        Assets are fetched concurrently and yielded in the order they complete,
+        which is not necessarily the order they were given in. Assets which are
+        not found, or which can't be fetched, are skipped.
+
+        Args:
+            assets (str or int or iterable): Assets for which data will be returned.
+            workers (int, optional): Number of assets to fetch concurrently.
+                Defaults to 8.
+            result (BulkResult or None, optional): If provided, ids which weren't
+                found, or couldn't be fetched, are recorded in its 'missing' and
+                'failed' attributes.
+
+        Yields:
+            Tuple of the asset (as given) and a dict containing its details.
+
+        """
+        assets = [assets] if isinstance(assets, (str, int)) else assets
+        yield from _bulk(self._get_detailed, assets, workers, ordered=False, result=result)
+
+    def iter_basic(self, assets:Union[str, int, Iterable], workers:int=8, result:Union[BulkResult, None]=None) -> Iterator[Tuple]:
+        """Generator which yields basic attributes for each asset as it is fetched.
+
+        See 'iter_detailed' for details.
+
+        Args:
+            assets (str or int or iterable): Assets for which data will be returned.
+            workers (int, optional): Number of assets to fetch concurrently.
+                Defaults to 8.
+            result (BulkResult or None, optional): If provided, ids which weren't
+                found, or couldn't be fetched, are recorded in its 'missing' and
+                'failed' attributes.
+
+        Yields:
+            Tuple of the asset (as given) and a dict containing its details.
+
+        """
+        assets = [assets] if isinstance(assets, (str, int)) else assets
+        yield from _bulk(self._get_basic, assets, workers, ordered=False, result=result)
+
+    def _get_detailed(self, asset:Union[str, int]) -> Union[dict, None]:
+        url = self.token.api_url+r"/api/Asset/"+str(asset)
+        return _cached(self.token, "asset_detailed", str(asset), lambda: self._get(url, "api/Asset/{id}"))
+
+    def _get_basic(self, asset:Union[str, int]) -> Union[dict, None]:
+        url = self.token.api_url+r"/api/Asset/basic/"+str(asset)
+        return _cached(self.token, "asset_basic", str(asset), lambda: self._get(url, "api/Asset/basic/{id}"))
+
+    def _get(self, url:str, endpoint:str) -> Union[dict, None]:
+        response = _check(self.token.client.request("GET", url, token=self.token, endpoint=endpoint))
+        response = _decode(response)
+        return None if "ErrorType" in response else response
 
     def find_by_field(self, field:str, value:Union[str, int]) -> dict:
         """Method which returns all attributes for an asset based on a field search.
@@ -341,18 +1542,46 @@ class Asset(object):
             Dict containing details of the asset.
 
         """
+        asset_data = self._find_by_field(field, value)
+        return {} if asset_data is None else asset_data
+
+    def find_by_field_many(self, field:str, values:Iterable, workers:int=8) -> dict:
+        """Method which finds the asset matching each of many values of a field.
+
+        Duplicate values are only searched for once and the searches are made
+        concurrently. As with 'find_by_field', only unique matches are found.
+
+        Args:
+            field (str): name of the field to search.
+            values (iterable): values to search the field for.
+            workers (int, optional): Number of searches made at once. Defaults
+                to 8.
+
+        Returns:
+            BulkResult (dict) of value -> details of the asset found. Values
+            with no unique match, or which couldn't be searched for, are listed
+            in its 'missing' and 'failed' attributes.
+
+        """
+        unique = {}
+        for value in values:
+            unique.setdefault(str(value), value)
+        result = BulkResult()
+        result.update(_bulk(lambda value: self._find_by_field(field, value), unique.values(), workers, result=result))
+        return result
+
+    def _find_by_field(self, field:str, value:Union[str, int]) -> Union[dict, None]:
         value = str(value)
         url = self.token.api_url+r"/api/asset/find_by_field"
-        headers = { "X-ConnectionName": self.token.connection,
-                    "Authorization": "bearer "+self.token.get_token(),
-                    "Content-Type": "application/x-www-form-urlencoded" }
+        return _cached(self.token, "asset_find", str(field)+"="+value, lambda: self._find(url, field, value))
+
+    def _find(self, url:str, field:str, value:str) -> Union[dict, None]:
+        headers = { "Content-Type": "application/x-www-form-urlencoded" }
         payload = { "Field": str(field),
                     "Value": str(value) }
-        response = requests.post(url, data=urllib.parse.urlencode(payload), headers=headers, verify=verify)
-        asset_data = json.loads(response.text)
-        if "ErrorType" in asset_data:
-            asset_data = {}
-        return asset_data
+        response = _check(self.token.client.request("POST", url, token=self.token, endpoint="api/asset/find_by_field", data=urllib.parse.urlencode(payload), headers=headers))
+        asset_data = _decode(response)
+        return None if "ErrorType" in asset_data else asset_data
 
 
 class Action(object):
@@ -374,27 +1603,55 @@ class Action(object):
         """
         self.token = token
 
-    def get_detailed(self, actions:Union[str, list]) -> dict:
+    def get_detailed(self, actions:Union[str, list], workers:int=1) -> dict:
         """Method which returns all attributes for an asset/list of actions.
 
         Args:
             actions (str or int or list): Actions for which data will be returned.
+            workers (int, optional): Number of actions to fetch concurrently.
+                Defaults to 1 (one at a time).
 
         Returns:
-            Dict containing a dict object for each action queried.
+            BulkResult (dict) containing a dict object for each action found. Ids
+            which weren't found, or which couldn't be fetched, are listed in its
+            'missing' and 'failed' attributes.
 
         """
         actions = [actions] if type(actions) != list else actions
-        action_data = {}
-        for action in actions:
-            url = self.token.api_url+r"/api/Action/"+str(action)
-            headers = { "X-ConnectionName": self.token.connection,
-                        "Authorization": "bearer "+self.token.get_token() }
-            response = requests.get(url, headers=headers, verify=verify)
-            response = json.loads(response.text)
-            if "ErrorType" not in response:
-                action_data[action] = response
-        return action_data
+        result = BulkResult()
+        result.update(_bulk(self._get_detailed, actions, workers, result=result))
+        return result
+
+    def iter_detailed(self, actions:Union[str, int, Iterable], workers:int=8, result:Union[BulkResult, None]=None) -> Iterator[Tuple]:
+        """Generator which yields all attributes for each action as it is fetched.
+
+        Actions are fetched concurrently and yielded in the order they complete,
+        which is not necessarily the order they were given in. Actions which are
+        not found, or which can't be fetched, are skipped.
+
+        Args:
+            actions (str or int or iterable): Actions for which data will be returned.
+            workers (int, optional): Number of actions to fetch concurrently.
+                Defaults to 8.
+            result (BulkResult or None, optional): If provided, ids which weren't
+                found, or couldn't be fetched, are recorded in its 'missing' and
+                'failed' attributes.
+
+        Yields:
+            Tuple of the action (as given) and a dict containing its details.
+
+        """
+        actions = [actions] if isinstance(actions, (str, int)) else actions
+        yield from _bulk(self._get_detailed, actions, workers, ordered=False, result=result)
+
+    def _get_detailed(self, action:Union[str, int]) -> Union[dict, None]:
+        url = self.token.api_url+r"/api/Action/"+str(action)
+        return _cached(self.token, "action_detailed", str(action), lambda: self._get(url, "api/Action/{id}"))
+
+    def _get(self, url:str, endpoint:str) -> Union[dict, None]:
+        response = _check(self.token.client.request("GET", url, token=self.token, endpoint=endpoint))
+        response = _decode(response)
+        return None if "ErrorType" in response else response
 
     def find_by_field(self, field:str, value:Union[str, int]) -> dict:
         """Method which returns all attributes for an action based on a field search.
@@ -412,47 +1669,88 @@ class Action(object):
             Dict containing details of the action.
 
         """
+        action_data = self._find_by_field(field, value)
+        return {} if action_data is None else action_data
+
+    def find_by_field_many(self, field:str, values:Iterable, workers:int=8) -> dict:
+        """Method which finds the action matching each of many values of a field.
+
+        Duplicate values are only searched for once and the searches are made
+        concurrently. As with 'find_by_field', only unique matches are found.
+
+        Args:
+            field (str): name of the field to search.
+            values (iterable): values to search the field for.
+            workers (int, optional): Number of searches made at once. Defaults
+                to 8.
+
+        Returns:
+            BulkResult (dict) of value -> details of the action found. Values
+            with no unique match, or which couldn't be searched for, are listed
+            in its 'missing' and 'failed' attributes.
+
+        """
+        unique = {}
+        for value in values:
+            unique.setdefault(str(value), value)
+        result = BulkResult()
+        result.update(_bulk(lambda value: self._find_by_field(field, value), unique.values(), workers, result=result))
+        return result
+
+    def _find_by_field(self, field:str, value:Union[str, int]) -> Union[dict, None]:
         value = str(value)
         url = self.token.api_url+r"/api/action/find_by_field"
-        headers = { "X-ConnectionName": self.token.connection,
-                    "Authorization": "bearer "+self.token.get_token(),
-                    "Content-Type": "application/x-www-form-urlencoded" }
+        return _cached(self.token, "action_find", str(field)+"="+value, lambda: self._find(url, field, value))
+
+    def _find(self, url:str, field:str, value:str) -> Union[dict, None]:
+        headers = { "Content-Type": "application/x-www-form-urlencoded" }
         payload = { "Field": str(field),
                     "Value": str(value) }
-        response = requests.post(url, data=urllib.parse.urlencode(payload), headers=headers, verify=verify)
-        action_data = json.loads(response.text)
-        if "ErrorType" in action_data:
-            action_data = {}
-        return action_data
+        response = _check(self.token.client.request("POST", url, token=self.token, endpoint="api/action/find_by_field", data=urllib.parse.urlencode(payload), headers=headers))
+        action_data = _decode(response)
+        return None if "ErrorType" in action_data else action_data
 
-    def delete(self, actions:Union[str, list]) -> dict:
+    def delete(self, actions:Union[str, list]) -> BulkResult:
         """Method which deletes an action or list of actions by their action id.
 
-
+        Actions are deleted one at a time. For large numbers of actions see
+        conquest_api.deleter.BulkDeleter, which deletes concurrently and can
+        resume an interrupted run.
 
         Args:
             actions (str or int or list): Actions to delete.
 
         Returns:
-            Dict with the action ids as keys, and the server response as values.
-            These are formatted as dicts which contain any errors - an empty
-            dict corresponds with a successful deletion.
+            BulkResult (dict) with the action ids as keys, and the server
+            response as values. These are formatted as dicts which contain any
+            errors - an empty dict corresponds with a successful deletion.
+            Actions the server failed to answer for (e.g. a 500 or a timeout)
+            are listed in its 'failed' attribute with the exception, and the
+            remaining actions are still deleted.
 
         """
+        import requests
+
         actions = [actions] if type(actions) != list else actions
-        deleted = {}
-        for action in actions:
-            url = self.token.api_url+r"/api/Action/"+str(action)
-            headers = { "X-ConnectionName": self.token.connection,
-                        "Authorization": "bearer "+self.token.get_token() }
-            response = requests.delete(url, headers=headers, verify=verify)
-            if response.text != '':
-                response = json.loads(response.text)
-            else:
-                response = {}
-            deleted[action] = response
+        deleted = BulkResult()
+        try:
+            for action in actions:
+                try:
+                    response = _check(self._delete(action), _refused_statuses)
+                    deleted[action] = _decode(response) if response.content else {}
+                except (requests.exceptions.RequestException, json.JSONDecodeError) as error:
+                    deleted.failed[action] = error
+        finally:
+            # any cached field search may have matched a deleted action
+            _invalidate(self.token, ("action_find",))
         return deleted
 
+    def _delete(self, action:Union[str, int]) -> "requests.Response":
+        url = self.token.api_url+r"/api/Action/"+str(action)
+        response = self.token.client.request("DELETE", url, token=self.token, endpoint="api/Action/{id}")
+        _invalidate(self.token, ("action_detailed",), str(action))
+        return response
+
 
 class System(object):
     def __init__(self, token:Token) -> None:
@@ -473,10 +1771,8 @@ class System(object):
 
         """
         url = self.token.api_url+r"/api/system/connections"
-        headers = { "X-ConnectionName": self.token.connection,
-                    "Authorization": "bearer "+self.token.get_token() }
-        response = requests.get(url, headers=headers, verify=verify)
-        response =  json.loads(response.text)
+        response = _check(self.token.client.request("GET", url, token=self.token, endpoint="api/system/connections"), ())
+        response =  _decode(response)
         return response
 
     def version(self) -> dict:
@@ -484,10 +1780,8 @@ class System(object):
 
         """
         url = self.token.api_url+r"/api/system/version"
-        headers = { "X-ConnectionName": self.token.connection,
-                    "Authorization": "bearer "+self.token.get_token() }
-        response = requests.get(url, headers=headers, verify=verify)
-        response =  json.loads(response.text)
+        response = _check(self.token.client.request("GET", url, token=self.token, endpoint="api/system/version"), ())
+        response =  _decode(response)
         return response
 
     def whoami(self) -> str:
@@ -495,8 +1789,6 @@ class System(object):
 
         """
         url = self.token.api_url+r"/api/system/whoami"
-        headers = { "X-ConnectionName": self.token.connection,
-                    "Authorization": "bearer "+self.token.get_token() }
-        response = requests.get(url, headers=headers, verify=verify)
-        response =  json.loads(response.text)
+        response = _check(self.token.client.request("GET", url, token=self.token, endpoint="api/system/whoami"), ())
+        response =  _decode(response)
         return response
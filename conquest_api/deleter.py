@@ -0,0 +1,175 @@
+"""Resumable bulk action deletes for the Conquest API Python Wrapper
+
+BulkDeleter deletes actions concurrently and records the outcome of every
+delete in an append-only journal file (a JSON line per action). If a run is
+interrupted, running it again with the same journal skips the actions already
+confirmed as deleted and retries the rest. Only a summary of the run is kept in
+memory, rather than every server response.
+
+Outcomes recorded in the journal:
+    deleted: The server deleted the action.
+    missing: The server reported the action as not found (e.g. it was deleted
+        by an earlier run which stopped before recording it).
+    rejected: The server refused to delete the action (e.g. insufficient
+        permissions). Retried by the next run.
+    failed: The request failed (e.g. a timeout, or the server was
+        unavailable). Retried by the next run.
+
+Examples:
+    >>> from conquest_api.deleter import BulkDeleter
+    >>> deleter = BulkDeleter(token, 'purge_journal.jsonl', workers=8)
+    >>> deleter.run(action_ids)
+    {'total': 100000, 'skipped': 51234, 'deleted': 48750, 'missing': 12, 'rejected': 0, 'failed': 4,
+     'failed_actions': {'70138': 'HTTPError: 503 Server Error: ...', ...}}
+
+"""
+
+import json
+import os
+import time
+from typing import Dict, Iterable, NoReturn, Union
+
+import requests
+
+from conquest_api.conquest_api import Action, Token, _check, _decode, _fetch_many, _invalidate, _refused_statuses
+
+_confirmed = ("deleted", "missing") #: outcomes which are not retried
+
+
+class DeleteJournal(object):
+    def __init__(self, path:str, fsync:bool=False) -> None:
+        """Append-only record of the outcome of each delete.
+
+        Every line of the file is a JSON object containing the action id, its
+        outcome, the time and any error. An action's latest line is its current
+        outcome. A partly written last line (from a crash) is ignored.
+
+        Args:
+            path (str): Path of the journal file (created if it doesn't exist).
+            fsync (bool, optional): Flush each line to disk with os.fsync, so it
+                survives a power loss rather than just the process stopping.
+                Slower. Defaults to False.
+
+        """
+        self.path = path
+        self.fsync = fsync
+        self._file = None
+
+    def load(self) -> Dict[str, str]:
+        """Returns the latest outcome of each action in the journal.
+
+        """
+        outcomes = {}
+        if not os.path.exists(self.path):
+            return outcomes
+        with open(self.path, encoding="utf-8") as open_file:
+            for line in open_file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                outcomes[entry["action"]] = entry["outcome"]
+        return outcomes
+
+    def record(self, action:str, outcome:str, error:Union[str, None]=None) -> NoReturn:
+        """Appends an action's outcome to the journal.
+
+        """
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        entry = { "action": action, "outcome": outcome, "time": time.time() }
+        if error is not None:
+            entry["error"] = error
+        self._file.write(json.dumps(entry)+"\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> NoReturn:
+        """Closes the journal file.
+
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class BulkDeleter(object):
+    def __init__(self, token:Token, journal:Union[str, DeleteJournal], workers:int=8) -> None:
+        """Deletes many actions concurrently, journaling each outcome.
+
+        Args:
+            token (Token): Token object.
+            journal (str or DeleteJournal): Path of the journal file, or a
+                DeleteJournal.
+            workers (int, optional): Number of deletes sent at once. Keep this at
+                or below the pool_size of the token's Client. Defaults to 8.
+
+        """
+        self.action = Action(token)
+        self.token = token
+        self.journal = DeleteJournal(journal) if isinstance(journal, str) else journal
+        self.workers = workers
+
+    def run(self, actions:Iterable) -> dict:
+        """Deletes every action which the journal hasn't confirmed as deleted.
+
+        Actions are read from the iterable as they are needed, so it can be a
+        generator (e.g. reading ids from a file).
+
+        Args:
+            actions (iterable): Ids of the actions to delete.
+
+        Returns:
+            A dict containing:
+                total (int): Number of unique action ids given.
+                skipped (int): Actions confirmed by an earlier run.
+                deleted (int): Actions deleted by this run.
+                missing (int): Actions the server reported as not found.
+                rejected (int): Actions the server refused to delete.
+                failed (int): Actions whose delete request failed.
+                failed_actions (dict): Action id -> error message (str) for every
+                    rejected or failed action.
+
+        """
+        outcomes = self.journal.load()
+        summary = dict(total=0, skipped=0, deleted=0, missing=0, rejected=0, failed=0, failed_actions={})
+        seen = set()
+
+        def pending():
+            for action in actions:
+                action = str(action)
+                if action in seen:
+                    continue
+                seen.add(action)
+                summary["total"] += 1
+                if outcomes.get(action) in _confirmed:
+                    summary["skipped"] += 1
+                    continue
+                yield action
+
+        try:
+            for action, (outcome, error) in _fetch_many(self._delete, pending(), self.workers, ordered=False):
+                self.journal.record(action, outcome, error)
+                summary[outcome] += 1
+                if error is not None:
+                    summary["failed_actions"][action] = error
+        finally:
+            self.journal.close()
+            # any cached field search may have matched a deleted action
+            _invalidate(self.token, ("action_find",))
+        return summary
+
+    def _delete(self, action:str) -> tuple:
+        # returns (outcome, error message or None)
+        try:
+            response = _check(self.action._delete(action), _refused_statuses)
+            body = _decode(response) if response.content else {}
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as error:
+            return "failed", f"{type(error).__name__}: {error}"
+        body = body if isinstance(body, dict) else {}
+        if response.status_code == 404 or body.get("ErrorType") == "NotFound":
+            return "missing", None
+        if response.status_code < 400 and "ErrorType" not in body:
+            return "deleted", None
+        return "rejected", f"{body.get('ErrorType', response.status_code)}: {body.get('Message', '')}"
@@ -0,0 +1,209 @@
+"""Streaming record export for the Conquest API Python Wrapper
+
+Functions which fetch assets or actions from an iterable of ids (or a file of
+ids) and write them to NDJSON or CSV a record at a time. Records are fetched
+concurrently within a bounded window and written in the order of the ids, so
+memory use stays the same however many records are exported.
+
+The module can also be run from the command line (or as 'conquest-export' once
+installed), reading the password from the CONQUEST_PASSWORD environment
+variable:
+    conquest-export assets ids.txt assets.csv --format csv --api-url https://localhost/ConquestApi/api/
+        --username user --connection "Conquest Live"
+
+Examples:
+    >>> from conquest_api.export import export_assets, read_ids
+    >>> with open('assets.ndjson', 'w') as open_file:
+    ...     export_assets(token, read_ids('asset_ids.txt'), open_file, workers=8)
+    200000
+
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+from typing import Any, Iterable, Iterator, List, NoReturn, TextIO, Union
+
+from conquest_api.conquest_api import Action, Asset, BulkResult, Client, Token, TokenStore, _bulk
+
+
+def _csv_value(value:Any) -> Any:
+    # nested values (e.g. lists in detailed records) are written as JSON
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def write_ndjson(records:Iterable[dict], open_file:TextIO) -> int:
+    """Writes each record as a line of JSON.
+
+    Args:
+        records (iterable): Dicts to write.
+        open_file (file): Text file open for writing.
+
+    Returns:
+        Number of records written (int).
+
+    """
+    count = 0
+    for record in records:
+        open_file.write(json.dumps(record)+"\n")
+        count += 1
+    return count
+
+
+def write_csv(records:Iterable[dict], open_file:TextIO, fieldnames:Union[List[str], None]=None) -> int:
+    """Writes each record as a row of a CSV, with a header row.
+
+    Columns are written in the order of 'fieldnames', so every row (and every
+    file) has the same columns in the same order. Fields a record doesn't have
+    are written as empty values and fields which aren't columns are left out.
+
+    Args:
+        records (iterable): Dicts to write.
+        open_file (file): Text file open for writing (with newline='').
+        fieldnames (list or None, optional): Columns of the CSV. If not provided,
+            the keys of the first record are used.
+
+    Returns:
+        Number of records written (int).
+
+    """
+    writer = None
+    count = 0
+    for record in records:
+        if writer is None:
+            writer = csv.DictWriter(open_file, fieldnames=fieldnames or list(record), restval="", extrasaction="ignore")
+            writer.writeheader()
+        writer.writerow({ field: _csv_value(value) for field, value in record.items() })
+        count += 1
+    if writer is None and fieldnames:
+        csv.DictWriter(open_file, fieldnames=fieldnames).writeheader()
+    return count
+
+
+def write(records:Iterable[dict], open_file:TextIO, format:str="ndjson", fieldnames:Union[List[str], None]=None) -> int:
+    """Writes records with 'write_ndjson' or 'write_csv'.
+
+    Args:
+        records (iterable): Dicts to write.
+        open_file (file): Text file open for writing (with newline='' for CSV).
+        format (str, optional): 'ndjson' (default) or 'csv'.
+        fieldnames (list or None, optional): CSV columns. See 'write_csv'.
+
+    Returns:
+        Number of records written (int).
+
+    Raises:
+        ValueError: If format isn't 'ndjson' or 'csv'.
+
+    """
+    if format == "ndjson":
+        return write_ndjson(records, open_file)
+    if format == "csv":
+        return write_csv(records, open_file, fieldnames)
+    raise ValueError(f"Export format of {format} is not a valid option.")
+
+
+def read_ids(filename:str) -> Iterator[str]:
+    """Generator which yields the id on each line of a file, skipping blank lines.
+
+    """
+    with open(filename, encoding="utf-8-sig") as open_file:
+        for line in open_file:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def export_assets(token:Token, assets:Iterable, open_file:TextIO, format:str="ndjson", detailed:bool=True,
+                  fieldnames:Union[List[str], None]=None, workers:int=8, result:Union[BulkResult, None]=None) -> int:
+    """Fetches assets and writes each one to a file as it arrives.
+
+    Assets are written in the order of 'assets'. Assets which aren't found, or
+    which can't be fetched, are skipped.
+
+    Args:
+        token (Token): Token object.
+        assets (iterable): Asset ids, read as they are needed.
+        open_file (file): Text file open for writing (with newline='' for CSV).
+        format (str, optional): 'ndjson' (default) or 'csv'.
+        detailed (bool, optional): Export detailed rather than basic records.
+            Defaults to True.
+        fieldnames (list or None, optional): CSV columns. See 'write_csv'.
+        workers (int, optional): Number of assets fetched at once. Keep this at
+            or below the pool_size of the token's Client. Defaults to 8.
+        result (BulkResult or None, optional): If provided, ids which weren't
+            found, or couldn't be fetched, are recorded in its 'missing' and
+            'failed' attributes (no records are kept in it).
+
+    Returns:
+        Number of assets written (int).
+
+    """
+    asset = Asset(token)
+    fetch = asset._get_detailed if detailed else asset._get_basic
+    records = (record for _, record in _bulk(fetch, assets, workers, result=result))
+    return write(records, open_file, format, fieldnames)
+
+
+def export_actions(token:Token, actions:Iterable, open_file:TextIO, format:str="ndjson",
+                   fieldnames:Union[List[str], None]=None, workers:int=8, result:Union[BulkResult, None]=None) -> int:
+    """Fetches actions and writes each one to a file as it arrives.
+
+    See 'export_assets' for details.
+
+    """
+    records = (record for _, record in _bulk(Action(token)._get_detailed, actions, workers, result=result))
+    return write(records, open_file, format, fieldnames)
+
+
+def main(argv:Union[List[str], None]=None) -> NoReturn:
+    """Command line entry point. Run with --help for usage.
+
+    """
+    parser = argparse.ArgumentParser(prog="conquest-export", description="Export Conquest assets or actions to NDJSON or CSV.")
+    parser.add_argument("kind", choices=("assets", "actions"))
+    parser.add_argument("ids", help="file containing an id on each line, or - for stdin")
+    parser.add_argument("output", help="file to write, or - for stdout")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--basic", action="store_true", help="export basic rather than detailed asset records")
+    parser.add_argument("--fields", help="comma separated CSV columns (default: the first record's fields)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--api-url", default=os.environ.get("CONQUEST_API_URL"))
+    parser.add_argument("--username", default=os.environ.get("CONQUEST_USERNAME"))
+    parser.add_argument("--connection", default=os.environ.get("CONQUEST_CONNECTION"))
+    parser.add_argument("--verify", action="store_true", help="verify the server's certificate")
+    parser.add_argument("--token-store", nargs="?", const="", metavar="PATH",
+                        help="reuse tokens between runs by saving them, in plain text, to a file "
+                             "(default path: ~/.conquest_api/tokens.json)")
+    args = parser.parse_args(argv)
+    password = os.environ.get("CONQUEST_PASSWORD")
+    missing = [name for name, value in (("--api-url", args.api_url), ("--username", args.username),
+               ("--connection", args.connection), ("CONQUEST_PASSWORD", password)) if not value]
+    if missing:
+        parser.error("missing "+", ".join(missing))
+
+    client = Client(verify=args.verify, pool_size=max(args.workers, 10))
+    store = None if args.token_store is None else TokenStore(args.token_store or None)
+    token = Token(args.api_url, args.username, password, args.connection, client=client, store=store)
+    ids = (line.strip() for line in sys.stdin if line.strip()) if args.ids == "-" else read_ids(args.ids)
+    fieldnames = args.fields.split(",") if args.fields else None
+    result = BulkResult()
+    with client, (contextlib.nullcontext(sys.stdout) if args.output == "-" else
+                  open(args.output, "w", newline="" if args.format == "csv" else None, encoding="utf-8")) as open_file:
+        if args.kind == "assets":
+            count = export_assets(token, ids, open_file, args.format, not args.basic, fieldnames, args.workers, result)
+        else:
+            count = export_actions(token, ids, open_file, args.format, fieldnames, args.workers, result)
+    print(f"exported {count}, missing {len(result.missing)}, failed {len(result.failed)}", file=sys.stderr)
+    sys.exit(1 if result.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Asset hierarchy traversal for the Conquest API Python Wrapper
+
+This module walks up (ancestors) or down (descendants) the asset hierarchy
+using each asset's ParentID. The hierarchy is walked a level at a time and every
+asset in a level is fetched concurrently, so the time taken grows with the depth
+of the tree rather than the number of assets in it. Ancestors, which are shared
+by many assets, are remembered by the Hierarchy and not fetched again. Other
+records are only held for the level being walked, so walking down a large
+network doesn't hold the whole network in memory.
+
+The API doesn't list an asset's children, so walking down the hierarchy needs
+either a 'children' function (returning the child ids of an asset) or an index
+built from a set of candidate assets with 'index'.
+
+Examples:
+    >>> from conquest_api.hierarchy import Hierarchy
+    >>> hierarchy = Hierarchy(token, workers=16)
+    >>> for assetid, depth, record in hierarchy.ancestors(116983):
+    ...     print(depth, assetid, record['AssetDescription'])
+    >>> hierarchy.index(range(100000, 130000))
+    >>> with open('network.csv', 'w', newline='') as open_file:
+    ...     hierarchy.export(hierarchy.descendants(113670), open_file, format='csv')
+
+"""
+
+from typing import Callable, Iterable, Iterator, List, TextIO, Tuple, Union
+
+from conquest_api.conquest_api import Asset, BulkResult, Token, _bulk, _fetch_many
+from conquest_api.export import write
+
+
+class Hierarchy(object):
+    def __init__(self, token:Token, detailed:bool=False, workers:int=8,
+                 children:Union[Callable[[Union[str, int]], Iterable], None]=None) -> None:
+        """Walks the asset hierarchy, fetching each level concurrently.
+
+        Args:
+            token (Token): Token object.
+            detailed (bool, optional): Fetch detailed rather than basic asset
+                records. Defaults to False.
+            workers (int, optional): Number of assets fetched at once. Keep this
+                at or below the pool_size of the token's Client. Defaults to 8.
+            children (callable or None, optional): Function called with an asset
+                id which returns the ids of its children, used by 'descendants'.
+                It is called concurrently for each asset in a level. If not
+                provided, 'index' must be called before 'descendants'.
+
+        """
+        self.asset = Asset(token)
+        self.detailed = detailed
+        self.workers = workers
+        self.children = children
+        self._fetch = self.asset._get_detailed if detailed else self.asset._get_basic
+        self._records = {} #: str(asset id) -> record, or None if not found, of ancestors
+        self._index = None #: str(parent id) -> {str(child id): child id}, built by 'index'
+
+    def get(self, asset:Union[str, int]) -> Union[dict, None]:
+        """Returns the record of an asset, fetching it if it isn't a remembered ancestor.
+
+        Returns None if the asset wasn't found.
+
+        """
+        for _, record in self._level([asset]):
+            return record
+        return None
+
+    def ancestors(self, assets:Union[str, int, Iterable], include_self:bool=True,
+                  result:Union[BulkResult, None]=None) -> Iterator[Tuple]:
+        """Generator which yields each asset and every asset above it.
+
+        Assets are yielded a level at a time, starting with the given assets
+        (depth 0), then their parents (depth 1) and so on up to the top of the
+        hierarchy. Ancestors shared by several assets are yielded once.
+
+        Args:
+            assets (str or int or iterable): Assets to start from.
+            include_self (bool, optional): Yield the given assets as well as
+                their ancestors. Defaults to True.
+            result (BulkResult or None, optional): If provided, ids which weren't
+                found, or couldn't be fetched, are recorded in its 'missing' and
+                'failed' attributes.
+
+        Yields:
+            Tuple of the asset id, its depth and a dict containing its details.
+
+        """
+        frontier = self._unique(assets)
+        seen = { str(asset) for asset in frontier }
+        depth = 0
+        while frontier:
+            parents = []
+            for asset, record in self._level(frontier, result, remember=depth > 0):
+                if include_self or depth:
+                    yield asset, depth, record
+                parent = record.get("ParentID")
+                if parent and str(parent) not in seen:
+                    seen.add(str(parent))
+                    parents.append(parent)
+            frontier = parents
+            depth += 1
+
+    def descendants(self, assets:Union[str, int, Iterable], include_self:bool=True, max_depth:Union[int, None]=None,
+                    result:Union[BulkResult, None]=None) -> Iterator[Tuple]:
+        """Generator which yields each asset and every asset below it.
+
+        Assets are yielded a level at a time, starting with the given assets
+        (depth 0), then their children (depth 1) and so on. Each asset is
+        yielded once, even if it is below more than one of the given assets.
+
+        Args:
+            assets (str or int or iterable): Assets to start from.
+            include_self (bool, optional): Yield the given assets as well as
+                their descendants. Defaults to True.
+            max_depth (int or None, optional): Deepest level to yield, e.g. 1 for
+                the given assets' children only. None (default) has no limit.
+            result (BulkResult or None, optional): If provided, ids which weren't
+                found, or couldn't be fetched, are recorded in its 'missing' and
+                'failed' attributes.
+
+        Yields:
+            Tuple of the asset id, its depth and a dict containing its details.
+
+        Raises:
+            ValueError: If there is no 'children' function and 'index' hasn't
+                been called.
+
+        """
+        if self.children is not None:
+            children, workers = self.children, self.workers
+        elif self._index is not None:
+            # the index is local, so there's nothing to gain from threads
+            children, workers = (lambda asset: self._index.get(str(asset), {}).values()), 1
+        else:
+            raise ValueError("A children function or an index (see Hierarchy.index) is needed to find descendants.")
+        frontier = self._unique(assets)
+        seen = { str(asset) for asset in frontier }
+        depth = 0
+        while frontier:
+            found = []
+            for asset, record in self._level(frontier, result):
+                if include_self or depth:
+                    yield asset, depth, record
+                found.append(asset)
+            if max_depth is not None and depth >= max_depth:
+                return
+            frontier = []
+            for _, child_ids in _fetch_many(children, found, workers):
+                for child in child_ids:
+                    if str(child) not in seen:
+                        seen.add(str(child))
+                        frontier.append(child)
+            depth += 1
+
+    def index(self, assets:Iterable, result:Union[BulkResult, None]=None) -> int:
+        """Fetches a set of candidate assets and indexes them by their ParentID.
+
+        The index is used by 'descendants' to find the children of each asset
+        when no 'children' function was given. Only each asset's id is kept,
+        under its parent's id, rather than its record. Only the fetched assets can be
+        found as descendants, so the candidates should include every asset which
+        might be below the assets being walked. Calling it again adds to the
+        index.
+
+        Args:
+            assets (iterable): Candidate asset ids.
+            result (BulkResult or None, optional): If provided, ids which weren't
+                found, or couldn't be fetched, are recorded in its 'missing' and
+                'failed' attributes.
+
+        Returns:
+            Number of assets in the index (int).
+
+        """
+        if self._index is None:
+            self._index = {}
+        for asset, record in self._level(self._unique(assets), result):
+            parent = record.get("ParentID")
+            if parent:
+                self._index.setdefault(str(parent), {}).setdefault(str(asset), asset)
+        return sum(len(children) for children in self._index.values())
+
+    def export(self, nodes:Iterable[Tuple], open_file:TextIO, format:str="ndjson",
+               fieldnames:Union[List[str], None]=None) -> int:
+        """Writes the assets yielded by 'ancestors' or 'descendants' to a file.
+
+        Each record is written with its depth in a leading 'Depth' field.
+
+        Args:
+            nodes (iterable): Tuples yielded by 'ancestors' or 'descendants'.
+            open_file (file): Text file open for writing (with newline='' for CSV).
+            format (str, optional): 'ndjson' (default) or 'csv'.
+            fieldnames (list or None, optional): CSV columns. See
+                conquest_api.export.write_csv.
+
+        Returns:
+            Number of assets written (int).
+
+        Raises:
+            ValueError: If format isn't 'ndjson' or 'csv'.
+
+        """
+        records = ({ "Depth": depth, **record } for _, depth, record in nodes)
+        return write(records, open_file, format, fieldnames)
+
+    def _level(self, assets:List, result:Union[BulkResult, None]=None, remember:bool=False) -> List[Tuple]:
+        # fetches the assets which aren't remembered and returns (asset, record) for those found,
+        # remembering the fetched records if asked to (only ancestors are)
+        level = BulkResult()
+        records = { str(asset): self._records[str(asset)] for asset in assets if str(asset) in self._records }
+        unfetched = [asset for asset in assets if str(asset) not in records]
+        for asset, record in _bulk(self._fetch, unfetched, self.workers, ordered=False, result=level):
+            records[str(asset)] = record
+        for asset in level.missing:
+            records[str(asset)] = None
+        if remember:
+            self._records.update(records)
+        if result is not None:
+            result.missing.extend(level.missing)
+            result.failed.update(level.failed)
+        elif level.failed:
+            # without a result to record them in, failures aren't silently dropped from the hierarchy
+            raise next(iter(level.failed.values()))
+        found = []
+        for asset in assets:
+            record = records.get(str(asset))
+            if record is not None:
+                found.append((asset, record))
+        return found
+
+    def _unique(self, assets:Union[str, int, Iterable]) -> List:
+        assets = [assets] if isinstance(assets, (str, int)) else assets
+        unique = {}
+        for asset in assets:
+            unique.setdefault(str(asset), asset)
+        return list(unique.values())
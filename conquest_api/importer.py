@@ -0,0 +1,225 @@
+"""Row stream importer for the Conquest API Python Wrapper
+
+This module imports rows (dicts) straight from any iterable without the caller
+having to write an import file first. Rows are written to CSV in memory (or in a
+temporary file once a batch grows past the spool size) and are cut in to
+batches at a row or byte limit. Batches are uploaded and processed in parallel,
+and only a few batches are held at any time, so memory use does not grow with
+the number of rows.
+
+Examples:
+    >>> from conquest_api.importer import RowImporter
+    >>> importer = RowImporter(token, 'Asset', max_rows=5000, workers=4)
+    >>> summary = importer.run(row for row in csv.DictReader(open(filename)))
+    >>> summary['failed_rows']
+    {17: {'ParentCode': '001.003.020.999', ..., 'Error': 'Parent not found'}}
+
+"""
+
+import csv
+import io
+import tempfile
+import threading
+import time
+from concurrent import futures
+from typing import Iterable, List, NoReturn, Union
+
+import requests
+import urllib3
+
+from conquest_api.conquest_api import Import, Token
+
+
+def _unsent(error:requests.exceptions.ConnectionError) -> bool:
+    # True if a request provably never reached the server (so uploading again can't
+    # create a second batch): the connection timed out or couldn't be established
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+class _Chunk(object):
+    def __init__(self, number:int, fieldnames:List[str], spool_size:int) -> None:
+        """A batch of rows being serialised for upload. Used internally.
+
+        """
+        self.number = number
+        self.fieldnames = fieldnames
+        self.indices = [] #: source row index of each row in the chunk
+        self.keys = {} #: serialised row values -> source row indices
+        self.size = 0
+        self.buffer = tempfile.SpooledTemporaryFile(max_size=spool_size, mode="w+b")
+
+
+class RowImporter(object):
+    def __init__(self, token:Token, import_type:str, fieldnames:Union[List[str], None]=None, max_rows:int=5000,
+                 max_bytes:int=8*1024*1024, workers:int=4, retries:int=2, spool_size:int=1024*1024,
+                 poll_interval:float=0.1, max_interval:float=5.0) -> None:
+        """Importer which builds import files from a stream of rows.
+
+        Args:
+            token (Token): Token object
+            import_type (str): Type of import to be attempted. See
+                Import.import_types for a list of valid import types.
+            fieldnames (list or None, optional): Columns of the import file. If
+                not provided, the keys of the first row are used. Keys missing
+                from a row are written as empty values. Rows with keys which
+                aren't columns are not imported (see 'run').
+            max_rows (int, optional): Maximum number of rows per batch. Defaults
+                to 5000.
+            max_bytes (int, optional): Maximum size in bytes of each batch's file
+                (the last row may take it slightly over). Defaults to 8MB.
+            workers (int, optional): Number of batches uploaded and processed at
+                once. Defaults to 4.
+            retries (int, optional): Number of times a batch is uploaded again if
+                its upload couldn't connect to the server. Uploads which fail
+                after connecting aren't retried, as the server may have created
+                the batch. Defaults to 2.
+            spool_size (int, optional): Bytes of a batch kept in memory before it
+                is moved to a temporary file. Defaults to 1MB.
+            poll_interval (float, optional): See Import.wait. Defaults to 0.1.
+            max_interval (float, optional): See Import.wait. Defaults to 5.0.
+
+        Raises:
+            ValueError: If import_type is not a valid import type.
+
+        """
+        self.importer = Import(token)
+        if import_type not in self.importer.import_types:
+            raise ValueError(f"Import type of {import_type} is not a valid option.")
+        self.import_type = import_type
+        self.fieldnames = fieldnames
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.retries = retries
+        self.spool_size = spool_size
+        self.poll_interval = poll_interval
+        self.max_interval = max_interval
+
+    def run(self, rows:Iterable[dict]) -> dict:
+        """Imports every row, returning a summary once all batches have finished.
+
+        Errors reported by the server are matched back to the rows they came
+        from using the values of each row in the error CSV, so the error CSV
+        must contain the import file's columns (as Conquest's does).
+
+        Args:
+            rows (iterable): Dicts representing each row to import.
+
+        Returns:
+            A dict containing:
+                rows (int): Number of rows read.
+                batches (list): Dict for each batch, containing its number, batch
+                    id, first and last source row index and the Import.result
+                    style 'success' and 'error_msg' values.
+                failed_rows (dict): Source row index -> error row (dict) for every
+                    row which failed. Rows with keys which aren't columns of the
+                    import file are never uploaded and are listed here.
+                unmatched_errors (list): Error rows which could not be matched
+                    to a source row.
+                success (bool): True if every batch completed without errors.
+
+        """
+        summary = dict(rows=0, batches=[], failed_rows={}, unmatched_errors=[], success=True)
+        lock = threading.Lock()
+        # at most two batches per worker are held at once
+        slots = threading.BoundedSemaphore(self.workers*2)
+        line = io.StringIO()
+        writer = None
+        header = b""
+        chunk = None
+        pending = []
+
+        def submit(chunk):
+            slots.acquire()
+            future = executor.submit(self._process, chunk, summary, lock)
+            future.add_done_callback(lambda future: slots.release())
+            pending.append(future)
+
+        with futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for index, row in enumerate(rows):
+                if writer is None:
+                    fieldnames = self.fieldnames or list(row)
+                    columns = set(fieldnames)
+                    writer = csv.DictWriter(line, fieldnames=fieldnames, restval="")
+                    writer.writeheader()
+                    header = line.getvalue().encode("utf-8")
+                summary["rows"] = index+1
+                extra = [key for key in row if key not in columns]
+                if extra:
+                    with lock:
+                        error_msg = "Row has fields which aren't columns of the import: "+", ".join(map(str, extra))
+                        summary["failed_rows"][index] = { "Error": error_msg }
+                        summary["success"] = False
+                    continue
+                # serialise the row on its own to measure it
+                line.seek(0)
+                line.truncate()
+                writer.writerow(row)
+                data = line.getvalue().encode("utf-8")
+                if chunk is not None and (len(chunk.indices) >= self.max_rows or chunk.size+len(data) > self.max_bytes):
+                    submit(chunk)
+                    chunk = None
+                if chunk is None:
+                    chunk = _Chunk(len(pending), writer.fieldnames, self.spool_size)
+                    chunk.buffer.write(header)
+                    chunk.size = len(header)
+                chunk.buffer.write(data)
+                chunk.size += len(data)
+                chunk.indices.append(index)
+                chunk.keys.setdefault(self._key(row, chunk.fieldnames), []).append(index)
+            if chunk is not None:
+                submit(chunk)
+            for future in pending:
+                future.result()
+        summary["batches"].sort(key=lambda batch: batch["number"])
+        return summary
+
+    def _process(self, chunk:_Chunk, summary:dict, lock:threading.Lock) -> NoReturn:
+        name = f"{self.import_type}_{chunk.number:05d}.csv"
+        batch = None
+        error_rows = []
+        try:
+            for attempt in range(self.retries+1):
+                try:
+                    chunk.buffer.seek(0)
+                    batch = self.importer.upload_file(chunk.buffer, self.import_type, name)
+                    break
+                except requests.exceptions.ConnectionError as error:
+                    if attempt == self.retries or not _unsent(error):
+                        raise
+            status = self.importer.wait(batch, self.poll_interval, self.max_interval, self.import_type)
+            self.importer.invalidate(self.import_type)
+            success = status["Status"] == "Completed"
+            error_msg = None if success else status["Error"]
+            if not success and "Output to CSV" in error_msg:
+                start = time.perf_counter()
+                error_rows = list(self.importer.iter_errors(batch))
+                self.importer.phase("error_csv", self.import_type, start)
+            elif not success:
+                error_rows = None
+        except Exception as error:
+            success, error_msg, error_rows = False, f"{type(error).__name__}: {error}", None
+        finally:
+            chunk.buffer.close()
+        with lock:
+            summary["batches"].append(dict(number=chunk.number, batch=batch, first_row=chunk.indices[0],
+                                           last_row=chunk.indices[-1], success=success, error_msg=error_msg))
+            summary["success"] = summary["success"] and success
+            # the whole batch failed without an error CSV
+            if error_rows is None:
+                for index in chunk.indices:
+                    summary["failed_rows"][index] = { "Error": error_msg }
+                return
+            for error_row in error_rows:
+                indices = chunk.keys.get(self._key(error_row, chunk.fieldnames))
+                if indices:
+                    summary["failed_rows"][indices.pop(0)] = error_row
+                else:
+                    summary["unmatched_errors"].append(error_row)
+
+    def _key(self, row:dict, fieldnames:List[str]) -> tuple:
+        values = (row.get(field) for field in fieldnames)
+        return tuple("" if value is None else str(value) for value in values)
@@ -0,0 +1,280 @@
+"""Request metrics for the Conquest API Python Wrapper
+
+A MetricsRegistry installs hooks on a Client and counts every request it sends,
+recording latency histograms by endpoint (url template, e.g. 'api/Asset/{id}'),
+method and status, the number of requests in flight, retries, token requests and
+the time spent in each phase of an import. Metrics can be exported in the
+Prometheus/OpenMetrics text format. A TraceLog writes one JSON line per request.
+
+Nothing is recorded (and no hook is called) unless a registry or trace log is
+installed, so a client without them pays no cost beyond checking for hooks.
+
+Examples:
+    >>> from conquest_api.metrics import MetricsRegistry, TraceLog
+    >>> client = conquest_api.Client()
+    >>> metrics = MetricsRegistry().install(client)
+    >>> trace = TraceLog(open("requests.jsonl", "a")).install(client)
+    >>> token = conquest_api.Token(api_url, username, password, connection, client=client)
+    >>> conquest_api.Asset(token).get_basic(116983)
+    >>> print(metrics.to_prometheus())
+    # HELP conquest_requests_total Requests sent, by endpoint, method and status.
+    # TYPE conquest_requests_total counter
+    conquest_requests_total{endpoint="api/token",method="POST",status="200"} 1
+    ...
+
+"""
+
+import json
+import threading
+import time
+from typing import Dict, Iterable, NoReturn, TextIO, Tuple
+
+from conquest_api.conquest_api import Client
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0) #: seconds
+
+
+def _escape(value:str) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _labels(names:Tuple[str, ...], values:Tuple, extra:str="") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{"+",".join(pairs)+"}" if pairs else ""
+
+
+def _number(value:float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter(object):
+    def __init__(self, name:str, documentation:str, labelnames:Iterable[str]=()) -> None:
+        """Count which only goes up, kept for each combination of label values.
+
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.type = "counter"
+        self._values = {} #: label values -> count
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount:float=1) -> NoReturn:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0)+amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    def __init__(self, name:str, documentation:str, labelnames:Iterable[str]=()) -> None:
+        """Value which goes up and down, kept for each combination of label values.
+
+        """
+        super().__init__(name, documentation, labelnames)
+        self.type = "gauge"
+
+    def dec(self, *labels, amount:float=1) -> NoReturn:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(object):
+    def __init__(self, name:str, documentation:str, labelnames:Iterable[str]=(), buckets:Iterable[float]=DEFAULT_BUCKETS) -> None:
+        """Distribution of observed values (e.g. latencies) in cumulative buckets.
+
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))+(float("inf"),)
+        self.type = "histogram"
+        self._values = {} #: label values -> [count per bucket..., sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value:float, *labels) -> NoReturn:
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0]*len(self.buckets)+[0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            counts[-1] += value
+
+    def count(self, *labels) -> int:
+        counts = self._values.get(labels)
+        return 0 if counts is None else sum(counts[:-1])
+
+    def total(self, *labels) -> float:
+        counts = self._values.get(labels)
+        return 0.0 if counts is None else counts[-1]
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted((labels, list(counts)) for labels, counts in self._values.items())
+        for labels, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield self.name+"_bucket", _labels(self.labelnames, labels, f'le="{_number(bound)}"'), cumulative
+            yield self.name+"_sum", _labels(self.labelnames, labels), counts[-1]
+            yield self.name+"_count", _labels(self.labelnames, labels), cumulative
+
+
+class MetricsRegistry(object):
+    def __init__(self, buckets:Iterable[float]=DEFAULT_BUCKETS) -> None:
+        """Collection of request metrics, recorded through a Client's hooks.
+
+        Args:
+            buckets (iterable, optional): Upper bounds (seconds) of the latency
+                histogram buckets. Defaults to DEFAULT_BUCKETS.
+
+        Attributes:
+            requests (Counter): Requests by endpoint, method and status
+                (status is 'error' for connection errors and timeouts).
+            duration (Histogram): Request latency by endpoint, method and status.
+            in_flight (Gauge): Requests currently being sent, by endpoint.
+            retries (Counter): Retried requests by endpoint.
+            tokens (Counter): Token requests by grant type and success.
+            import_phase (Histogram): Seconds spent uploading, polling and
+                downloading error CSVs, by phase and import type.
+
+        """
+        self.requests = Counter("conquest_requests_total", "Requests sent, by endpoint, method and status.",
+                                ("endpoint", "method", "status"))
+        self.duration = Histogram("conquest_request_duration_seconds", "Request latency in seconds.",
+                                  ("endpoint", "method", "status"), buckets)
+        self.in_flight = Gauge("conquest_requests_in_flight", "Requests currently in flight.", ("endpoint",))
+        self.retries = Counter("conquest_retries_total", "Requests retried, by endpoint.", ("endpoint",))
+        self.tokens = Counter("conquest_token_requests_total", "Token requests, by grant type and success.",
+                              ("grant", "success"))
+        self.import_phase = Histogram("conquest_import_phase_seconds", "Seconds spent in each phase of an import.",
+                                      ("phase", "import_type"), buckets)
+        self.metrics = [self.requests, self.duration, self.in_flight, self.retries, self.tokens, self.import_phase]
+        self._clients = []
+
+    def install(self, client:Client) -> "MetricsRegistry":
+        """Adds the registry's hooks to a client. Returns the registry.
+
+        """
+        client.hooks["pre_request"].append(self._pre_request)
+        client.hooks["post_request"].append(self._post_request)
+        client.hooks["event"].append(self._event)
+        self._clients.append(client)
+        return self
+
+    def uninstall(self, client:Client) -> NoReturn:
+        """Removes the registry's hooks from a client.
+
+        """
+        client.hooks["pre_request"].remove(self._pre_request)
+        client.hooks["post_request"].remove(self._post_request)
+        client.hooks["event"].remove(self._event)
+        self._clients.remove(client)
+
+    def to_prometheus(self) -> str:
+        """Returns every metric in the Prometheus/OpenMetrics text exposition format.
+
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_number(value)}")
+        return "\n".join(lines)+"\n"
+
+    def as_dict(self) -> Dict[str, dict]:
+        """Returns a summary of requests by endpoint: count, errors, total and mean seconds.
+
+        """
+        summary = {}
+        for (endpoint, method, status), count in sorted(self.requests._values.items()):
+            entry = summary.setdefault(endpoint, dict(count=0, errors=0, seconds=0.0))
+            entry["count"] += count
+            if status == "error" or int(status) >= 400:
+                entry["errors"] += count
+            entry["seconds"] += self.duration.total(endpoint, method, status)
+        for entry in summary.values():
+            entry["mean_seconds"] = entry["seconds"]/entry["count"] if entry["count"] else 0.0
+        return summary
+
+    def _pre_request(self, info:dict) -> NoReturn:
+        self.in_flight.inc(info["endpoint"])
+
+    def _post_request(self, info:dict) -> NoReturn:
+        endpoint = info["endpoint"]
+        status = "error" if info["status"] is None else str(info["status"])
+        self.in_flight.dec(endpoint)
+        self.requests.inc(endpoint, info["method"], status)
+        self.duration.observe(info["elapsed"], endpoint, info["method"], status)
+
+    def _event(self, name:str, info:dict) -> NoReturn:
+        if name == "retry":
+            self.retries.inc(info["endpoint"])
+        elif name == "token":
+            self.tokens.inc(info["grant"], str(info["success"]).lower())
+        elif name == "import_phase":
+            self.import_phase.observe(info["seconds"], info["phase"], info["import_type"] or "")
+
+
+class TraceLog(object):
+    def __init__(self, stream:TextIO, include_url:bool=False) -> None:
+        """Structured log writing a JSON line for every request and event.
+
+        Each request line contains the time, method, endpoint, attempt, status,
+        elapsed seconds and error (if any). Event lines contain the event name
+        and its details.
+
+        Args:
+            stream (file): Text stream the lines are written to.
+            include_url (bool, optional): Also write each request's full url,
+                which includes ids and may be long. Defaults to False.
+
+        """
+        self.stream = stream
+        self.include_url = include_url
+        self._lock = threading.Lock()
+
+    def install(self, client:Client) -> "TraceLog":
+        """Adds the trace log's hooks to a client. Returns the trace log.
+
+        """
+        client.hooks["post_request"].append(self._post_request)
+        client.hooks["event"].append(self._event)
+        return self
+
+    def uninstall(self, client:Client) -> NoReturn:
+        """Removes the trace log's hooks from a client.
+
+        """
+        client.hooks["post_request"].remove(self._post_request)
+        client.hooks["event"].remove(self._event)
+
+    def _write(self, record:dict) -> NoReturn:
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self.stream.write(line+"\n")
+
+    def _post_request(self, info:dict) -> NoReturn:
+        record = dict(time=time.time(), method=info["method"], endpoint=info["endpoint"], attempt=info["attempt"],
+                      status=info["status"], elapsed=round(info["elapsed"], 6),
+                      error=None if info["error"] is None else f"{type(info['error']).__name__}: {info['error']}")
+        if self.include_url:
+            record["url"] = info["url"]
+        self._write(record)
+
+    def _event(self, name:str, info:dict) -> NoReturn:
+        self._write(dict(time=time.time(), event=name, **info))
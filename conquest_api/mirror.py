@@ -0,0 +1,248 @@
+"""Local SQLite mirror of assets and actions for the Conquest API Python Wrapper
+
+A Mirror keeps detailed asset and action records in a SQLite database with
+indexes on chosen fields, so lookups by id or by field value are answered
+locally rather than by the server. Unlike the API's find_by_field, a local
+lookup returns every matching record. Records older than 'ttl' seconds are
+stale: lookups which find stale records fetch them again, and 'refresh'
+fetches every stale record at once. The server is only asked for records
+which aren't in the mirror or are stale.
+
+Records are stored as JSON and fields are indexed using SQLite's JSON
+functions, so an index can be added for any field at any time.
+
+Examples:
+    >>> from conquest_api.mirror import Mirror
+    >>> mirror = Mirror(token, 'conquest_mirror.db', fields={'Action': ['UserText30']}, ttl=3600)
+    >>> mirror.load('Action', action_ids)
+    20000
+    >>> mirror.find_by_field('Action', 'UserText30', '2f55a41e-7892-4c5c-a4a9-d06f3a474cae')
+    [{'ActionID': 70138, 'ActionDescription': 'Basement car park - water leak', ...}]
+
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, NoReturn, Union
+
+from conquest_api.conquest_api import Action, Asset, BulkResult, Token, _bulk, get_json_codec
+
+_kinds = ("Asset", "Action")
+_field_pattern = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class Mirror(object):
+    def __init__(self, token:Token, path:str, fields:Union[Dict[str, Iterable[str]], None]=None,
+                 ttl:float=86400, workers:int=8) -> None:
+        """Local copy of asset and action records, indexed on chosen fields.
+
+        Args:
+            token (Token): Token object.
+            path (str): Path of the database file (created if it doesn't exist).
+            fields (dict or None, optional): Fields to index for each kind of
+                record, e.g. {'Asset': ['UserText30'], 'Action': ['UserText30']}.
+                More can be added with 'add_index'.
+            ttl (float, optional): Seconds a record stays fresh. Defaults to
+                86400.
+            workers (int, optional): Number of records fetched at once. Keep this
+                at or below the pool_size of the token's Client. Defaults to 8.
+
+        Raises:
+            ValueError: If a kind isn't 'Asset' or 'Action', or a field name
+                isn't a valid field name.
+
+        """
+        self.path = path
+        self.ttl = ttl
+        self.workers = workers
+        self._fetchers = { "Asset": Asset(token)._get_detailed, "Action": Action(token)._get_detailed }
+        self._finders = { "Asset": Asset(token).find_by_field, "Action": Action(token).find_by_field }
+        self._lock = threading.Lock()
+        self._local = 0 #: lookups answered locally
+        self._fetched = 0 #: records fetched from the server
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("""CREATE TABLE IF NOT EXISTS records (
+                                    kind TEXT NOT NULL,
+                                    id TEXT NOT NULL,
+                                    fetched REAL NOT NULL,
+                                    data TEXT NOT NULL,
+                                    PRIMARY KEY (kind, id))""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS records_fetched ON records (kind, fetched)")
+        for kind, names in (fields or {}).items():
+            for field in names:
+                self.add_index(kind, field)
+
+    def add_index(self, kind:str, field:str) -> NoReturn:
+        """Indexes a field of a kind of record, for 'find_by_field'.
+
+        Records already in the mirror are indexed too.
+
+        """
+        self._kind(kind)
+        with self._lock, self._db:
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS records_{field} ON records (kind, {self._extract(field)})")
+
+    def store(self, kind:str, records:Iterable[dict]) -> int:
+        """Adds (or replaces) records in the mirror. Returns the number stored.
+
+        """
+        key = self._kind(kind)+"ID"
+        now = time.time()
+        codec = get_json_codec()
+        rows = ((kind, str(record[key]), now, codec.dumps(record)) for record in records)
+        with self._lock, self._db:
+            return self._db.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?)", rows).rowcount
+
+    def remove(self, kind:str, items:Iterable) -> NoReturn:
+        """Removes records from the mirror, e.g. after they are deleted.
+
+        """
+        self._kind(kind)
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM records WHERE kind=? AND id=?", ((kind, str(item)) for item in items))
+
+    def load(self, kind:str, items:Iterable, result:Union[BulkResult, None]=None) -> int:
+        """Fetches records which aren't in the mirror, or are stale, from the server.
+
+        Args:
+            kind (str): 'Asset' or 'Action'.
+            items (iterable): Record ids.
+            result (BulkResult or None, optional): If provided, ids which weren't
+                found, or couldn't be fetched, are recorded in its 'missing' and
+                'failed' attributes (no records are kept in it).
+
+        Returns:
+            Number of records fetched (int).
+
+        """
+        self._kind(kind)
+        fresh = time.time()-self.ttl
+        def unfetched():
+            for item in items:
+                with self._lock:
+                    row = self._db.execute("SELECT fetched FROM records WHERE kind=? AND id=?", (kind, str(item))).fetchone()
+                if row is None or row[0] < fresh:
+                    yield item
+        return self._fetch(kind, unfetched(), result)
+
+    def refresh(self, kind:Union[str, None]=None, result:Union[BulkResult, None]=None) -> int:
+        """Fetches every stale record again. Records which no longer exist are removed.
+
+        Args:
+            kind (str or None, optional): 'Asset' or 'Action'. None (default)
+                refreshes both.
+            result (BulkResult or None, optional): See 'load'.
+
+        Returns:
+            Number of records fetched (int).
+
+        """
+        count = 0
+        for kind in (_kinds if kind is None else (self._kind(kind),)):
+            with self._lock:
+                stale = [row[0] for row in self._db.execute("SELECT id FROM records WHERE kind=? AND fetched<?",
+                                                            (kind, time.time()-self.ttl))]
+            count += self._fetch(kind, stale, result)
+        return count
+
+    def get(self, kind:str, item:Union[str, int]) -> Union[dict, None]:
+        """Returns a record by its id, fetching it if it isn't in the mirror or is stale.
+
+        Returns None if the record doesn't exist.
+
+        """
+        self._kind(kind)
+        with self._lock:
+            row = self._db.execute("SELECT fetched, data FROM records WHERE kind=? AND id=?", (kind, str(item))).fetchone()
+        if row is not None and row[0] >= time.time()-self.ttl:
+            self._local += 1
+            return get_json_codec().loads(row[1])
+        self._fetch(kind, [item])
+        with self._lock:
+            row = self._db.execute("SELECT data FROM records WHERE kind=? AND id=?", (kind, str(item))).fetchone()
+        return None if row is None else get_json_codec().loads(row[0])
+
+    def find_by_field(self, kind:str, field:str, value:Union[str, int, float]) -> List[dict]:
+        """Returns every record whose field has the given value.
+
+        Matching records in the mirror are returned (stale ones are fetched
+        again first). If none match, the server's find_by_field is used, which
+        only finds a unique match, and the record found is added to the mirror.
+        The field should be indexed with 'add_index', otherwise every record of
+        the kind is scanned.
+
+        Args:
+            kind (str): 'Asset' or 'Action'.
+            field (str): Name of the field to search.
+            value (str or int or float): Value to search for. Compared with the
+                stored value as is, so it should have the field's type.
+
+        Returns:
+            List of the matching records (dicts), which is empty if none match.
+
+        """
+        self._kind(kind)
+        matches = self._query(kind, field, value)
+        stale = [item for item, fetched, _ in matches if fetched < time.time()-self.ttl]
+        if stale:
+            self._fetch(kind, stale)
+            matches = self._query(kind, field, value)
+        if matches:
+            self._local += 1
+            codec = get_json_codec()
+            return [codec.loads(data) for _, _, data in matches]
+        record = self._finders[kind](field, value)
+        if not record:
+            return []
+        self._fetched += 1
+        self.store(kind, [record])
+        return [record]
+
+    def stats(self) -> dict:
+        """Returns a dict of lookup statistics.
+
+        """
+        with self._lock:
+            counts = dict(self._db.execute("SELECT kind, COUNT(*) FROM records GROUP BY kind").fetchall())
+        return dict(local=self._local, fetched=self._fetched, records=counts)
+
+    def close(self) -> NoReturn:
+        """Closes the database.
+
+        """
+        self._db.close()
+
+    def _fetch(self, kind:str, items:Iterable, result:Union[BulkResult, None]=None) -> int:
+        # fetches records, storing those found and removing those which no longer exist
+        fetched = BulkResult() if result is None else result
+        missing = len(fetched.missing)
+        count = 0
+        batch = []
+        for _, record in _bulk(self._fetchers[kind], items, self.workers, ordered=False, result=fetched):
+            batch.append(record)
+            if len(batch) >= 500:
+                count += self.store(kind, batch)
+                batch = []
+        count += self.store(kind, batch)
+        self.remove(kind, fetched.missing[missing:])
+        self._fetched += count
+        return count
+
+    def _query(self, kind:str, field:str, value:Union[str, int, float]) -> List[tuple]:
+        with self._lock:
+            return self._db.execute(f"SELECT id, fetched, data FROM records WHERE kind=? AND {self._extract(field)}=?",
+                                    (kind, value)).fetchall()
+
+    def _kind(self, kind:str) -> str:
+        if kind not in _kinds:
+            raise ValueError(f"Kind of {kind} is not a valid option.")
+        return kind
+
+    def _extract(self, field:str) -> str:
+        # field names are put in to SQL, so only plain names are allowed
+        if not _field_pattern.match(field):
+            raise ValueError(f"Field name of {field} is not valid.")
+        return f"json_extract(data, '$.{field}')"
@@ -0,0 +1,177 @@
+"""Multi-connection pool for the Conquest API Python Wrapper
+
+A ConnectionPool holds a Token, and its own Client (session), for each of
+several Conquest connections (e.g. live, test and each department's
+database). The same operation can then be run against every connection at
+once, with the results keyed by connection name. Each connection's client
+limits its own requests in flight, so a slow database only slows the
+operations against it; 'imap' yields each connection's result as soon as it
+is ready.
+
+Examples:
+    >>> from conquest_api.pool import ConnectionPool
+    >>> pool = ConnectionPool.connect(api_url, username, password, connection='Conquest Live', workers=4)
+    >>> pool.version()
+    {'Conquest Live': {'Version': ...}, 'Conquest Test': {'Version': ...}}
+    >>> pool.get_basic([116983, 116984])
+    {'Conquest Live': {116983: {...}, 116984: {...}}, 'Conquest Test': {116983: {...}}}
+
+"""
+
+from typing import Callable, Dict, Iterable, Iterator, List, NoReturn, Tuple, Union
+
+import requests
+
+from conquest_api.conquest_api import Action, Asset, BulkResult, Client, System, Token, TokenStore, _fetch_many
+
+
+class ConnectionPool(object):
+    def __init__(self, tokens:Union[Dict[str, Token], Iterable[Token]], workers:int=4) -> None:
+        """Pool of tokens for several Conquest connections.
+
+        Args:
+            tokens (dict or iterable): Token for each connection, as a dict of
+                connection name -> Token, or an iterable of Tokens (keyed by
+                their connection). Each should have its own Client.
+            workers (int, optional): Number of requests each bulk operation
+                sends to a connection at once. Defaults to 4.
+
+        """
+        if not isinstance(tokens, dict):
+            tokens = { token.connection: token for token in tokens }
+        self.tokens = tokens
+        self.workers = workers
+
+    @classmethod
+    def connect(cls, api_url:str, username:str, password:str, connections:Union[List[str], None]=None,
+                connection:Union[str, None]=None, workers:int=4, store:Union[TokenStore, None]=None,
+                **client_options) -> "ConnectionPool":
+        """Creates a pool with a Token and Client for each connection.
+
+        Args:
+            api_url (str): URL of the Conquest API.
+            username (str): Username used for every connection.
+            password (str): Password used for every connection.
+            connections (list or None, optional): Names of the connections. If
+                not provided, they are listed with System.connections.
+            connection (str or None, optional): Connection used to list the
+                connections, needed if 'connections' isn't provided.
+            workers (int, optional): See ConnectionPool. Also the default
+                'max_concurrency' of each connection's Client.
+            store (TokenStore or None, optional): Store shared by every token.
+            **client_options: Passed to each connection's Client, e.g. timeout.
+
+        Returns:
+            A ConnectionPool.
+
+        Raises:
+            ValueError: If neither 'connections' nor 'connection' is provided.
+
+        """
+        client_options.setdefault("max_concurrency", workers)
+        client_options.setdefault("pool_size", max(workers, 10))
+        tokens = {}
+        if connections is None:
+            if connection is None:
+                raise ValueError("Either connections or a connection to list them with is needed.")
+            tokens[connection] = Token(api_url, username, password, connection, client=Client(**client_options), store=store)
+            connections = System(tokens[connection]).connections()
+        for name in connections:
+            if name not in tokens:
+                tokens[name] = Token(api_url, username, password, name, client=Client(**client_options), store=store)
+        return cls({ name: tokens[name] for name in connections }, workers)
+
+    @property
+    def connections(self) -> List[str]:
+        """Names of the pool's connections.
+
+        """
+        return list(self.tokens)
+
+    def imap(self, function:Callable[[Token], object], connections:Union[Iterable[str], None]=None) -> Iterator[Tuple]:
+        """Generator which runs a function for every connection at once.
+
+        Args:
+            function (callable): Called with each connection's Token.
+            connections (iterable or None, optional): Names of the connections to
+                use. Defaults to every connection.
+
+        Yields:
+            Tuple of the connection name, the function's result and the
+            exception raised (None if it succeeded), as each one finishes.
+
+        """
+        names = self.connections if connections is None else list(connections)
+
+        def attempt(name):
+            try:
+                return function(self.tokens[name]), None
+            except (requests.exceptions.RequestException, ValueError) as error:
+                return None, error
+
+        for name, (value, error) in _fetch_many(attempt, names, max(len(names), 1), ordered=False):
+            yield name, value, error
+
+    def map(self, function:Callable[[Token], object], connections:Union[Iterable[str], None]=None) -> BulkResult:
+        """Runs a function for every connection at once and waits for every result.
+
+        Args:
+            function (callable): Called with each connection's Token.
+            connections (iterable or None, optional): Names of the connections to
+                use. Defaults to every connection.
+
+        Returns:
+            BulkResult (dict) of connection name -> result. Connections where the
+            function raised a request error (or the token couldn't be created)
+            are listed in its 'failed' attribute with the exception.
+
+        """
+        connections = self.connections if connections is None else list(connections)
+        outcomes = { name: (value, error) for name, value, error in self.imap(function, connections) }
+        result = BulkResult()
+        # in the pool's order rather than the order they finished
+        for name in connections:
+            value, error = outcomes[name]
+            if error is None:
+                result[name] = value
+            else:
+                result.failed[name] = error
+        return result
+
+    def version(self, connections:Union[Iterable[str], None]=None) -> BulkResult:
+        """Returns System.version for each connection, e.g. as a health check.
+
+        """
+        return self.map(lambda token: System(token).version(), connections)
+
+    def get_basic(self, assets:Union[str, int, list], connections:Union[Iterable[str], None]=None) -> BulkResult:
+        """Returns Asset.get_basic for each connection.
+
+        """
+        return self.map(lambda token: Asset(token).get_basic(assets, self.workers), connections)
+
+    def get_detailed(self, assets:Union[str, int, list], connections:Union[Iterable[str], None]=None) -> BulkResult:
+        """Returns Asset.get_detailed for each connection.
+
+        """
+        return self.map(lambda token: Asset(token).get_detailed(assets, self.workers), connections)
+
+    def get_actions(self, actions:Union[str, int, list], connections:Union[Iterable[str], None]=None) -> BulkResult:
+        """Returns Action.get_detailed for each connection.
+
+        """
+        return self.map(lambda token: Action(token).get_detailed(actions, self.workers), connections)
+
+    def close(self) -> NoReturn:
+        """Stops each token's background refresh and closes each client.
+
+        """
+        for token in self.tokens.values():
+            token.close()
+            token.client.close()
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *args) -> NoReturn:
+        self.close()
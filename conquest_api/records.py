@@ -0,0 +1,188 @@
+"""Columnar record storage for the Conquest API Python Wrapper
+
+A RecordTable holds many asset or action records in columns rather than as a
+dict per record. Field names are stored once in a schema shared by every
+record, whole number and decimal fields are stored in typed arrays (8 bytes a
+value rather than a Python object each) and repeated text values (e.g. a
+FamilyCode shared by many assets) are stored once. Detailed records with many
+user fields take a fraction of the memory of the equivalent dicts.
+
+A RecordTable is a read-only mapping of record id -> record, so it can be used
+in place of the dict returned by get_detailed. Records are rebuilt as dicts
+when they are accessed.
+
+Examples:
+    >>> from conquest_api.records import RecordTable
+    >>> table = RecordTable(key='AssetID')
+    >>> table.extend(record for _, record in asset.iter_detailed(asset_ids, workers=8))
+    >>> table[116983]['AssetDescription']
+    'Alaska Court - 150mm PVC Sewer Gravity Main - AssetID 116983'
+    >>> mains = table.filter(lambda record: record['FamilyCode'].startswith('005.004'))
+    >>> with open('mains.csv', 'w', newline='') as open_file:
+    ...     mains.select(['AssetID', 'AssetDescription', 'UserNumber3']).to_csv(open_file)
+
+"""
+
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Any, Callable, Iterable, Iterator, List, NoReturn, TextIO, Union
+
+from conquest_api.export import write_csv
+
+
+class _Column(object):
+    __slots__ = ("kind", "values", "nulls", "pool")
+
+    def __init__(self, length:int=0) -> None:
+        """Values of one field. Used internally.
+
+        A column starts as whole numbers ('q') and becomes decimal ('d') or
+        generic ('o') as values which don't fit arrive. None values in numeric
+        columns are recorded in 'nulls'.
+
+        """
+        self.kind = "q"
+        self.values = array("q", bytes(8*length))
+        self.nulls = bytearray(b"\x01"*length)
+        self.pool = None #: text value -> shared copy, for generic columns
+
+    def append(self, value:Any) -> NoReturn:
+        if self.kind != "o":
+            if value is None:
+                self.values.append(0)
+                self.nulls.append(1)
+                return
+            if type(value) is int and self.kind == "q" and -2**63 <= value < 2**63:
+                self.values.append(value)
+                self.nulls.append(0)
+                return
+            if type(value) in (int, float) and (self.kind == "d" or type(value) is float):
+                if self.kind == "q":
+                    self.kind = "d"
+                    self.values = array("d", self.values)
+                self.values.append(value)
+                self.nulls.append(0)
+                return
+            self._to_generic()
+        if type(value) is str:
+            value = self.pool.setdefault(value, value)
+        self.values.append(value)
+
+    def get(self, index:int) -> Any:
+        if self.kind != "o" and self.nulls[index]:
+            return None
+        return self.values[index]
+
+    def _to_generic(self) -> NoReturn:
+        self.values = [None if null else value for value, null in zip(self.values, self.nulls)]
+        self.nulls = None
+        self.kind = "o"
+        self.pool = {}
+
+
+class RecordTable(Mapping):
+    def __init__(self, key:str="AssetID", records:Iterable[dict]=()) -> None:
+        """Read-only mapping of record id -> record, stored in columns.
+
+        Args:
+            key (str, optional): Field holding each record's id, 'AssetID' for
+                assets or 'ActionID' for actions. Defaults to 'AssetID'.
+            records (iterable, optional): Records (dicts) to add.
+
+        Notes:
+            Numbers in a field which also contains decimals are returned as
+            floats. A record without a field which other records have returns
+            None for it. A record with the same id as an earlier one replaces it.
+
+        """
+        self.key = key
+        self.fields = [] #: field names, in the order they were first seen
+        self._columns = {} #: field name -> _Column
+        self._rows = {} #: record id -> row number
+        self._length = 0
+        self.extend(records)
+
+    def append(self, record:dict) -> NoReturn:
+        """Adds a record.
+
+        Raises:
+            KeyError: If the record has no key field.
+
+        """
+        item = record[self.key]
+        for field in record:
+            if field not in self._columns:
+                field = sys.intern(field)
+                self.fields.append(field)
+                self._columns[field] = _Column(self._length)
+        for field, column in self._columns.items():
+            column.append(record.get(field))
+        # a replaced record's old row is left in the columns, unreferenced
+        self._rows[item] = self._length
+        self._length += 1
+
+    def extend(self, records:Iterable[dict]) -> NoReturn:
+        """Adds each record of an iterable.
+
+        """
+        for record in records:
+            self.append(record)
+
+    def row(self, index:int) -> dict:
+        """Returns a record (dict) by its row number.
+
+        """
+        return { field: column.get(index) for field, column in self._columns.items() }
+
+    def column(self, field:str) -> List[Any]:
+        """Returns every record's value of a field, in row order.
+
+        """
+        column = self._columns[field]
+        return [column.get(index) for index in self._rows.values()]
+
+    def select(self, fields:Iterable[str]) -> "RecordTable":
+        """Returns a new table containing only the given fields (and the key).
+
+        """
+        fields = list(fields)
+        if self.key not in fields:
+            fields.insert(0, self.key)
+        columns = [(field, self._columns[field]) for field in fields]
+        return RecordTable(self.key, ({ field: column.get(index) for field, column in columns } for index in self._rows.values()))
+
+    def filter(self, predicate:Callable[[dict], bool]) -> "RecordTable":
+        """Returns a new table of the records for which predicate(record) is true.
+
+        """
+        return RecordTable(self.key, (record for record in self.values() if predicate(record)))
+
+    def to_csv(self, open_file:TextIO, fields:Union[List[str], None]=None) -> int:
+        """Writes the records to a CSV, with a header row of the table's fields.
+
+        Args:
+            open_file (file): Text file open for writing (with newline='').
+            fields (list or None, optional): Columns to write. Defaults to every
+                field of the table.
+
+        Returns:
+            Number of records written (int).
+
+        """
+        return write_csv(self.values(), open_file, fields or self.fields)
+
+    def __getitem__(self, item:Any) -> dict:
+        return self.row(self._rows[item])
+
+    def __iter__(self) -> Iterator:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, item:Any) -> bool:
+        return item in self._rows
+
+    def __repr__(self) -> str:
+        return f"<RecordTable key={self.key!r} records={len(self)} fields={len(self.fields)}>"
@@ -0,0 +1,304 @@
+"""Import file validation for the Conquest API Python Wrapper
+
+Checks an import file locally before it is uploaded, so that problems such as
+a misspelt column or a non-numeric id are found without an upload, a server
+validation pass and an error CSV download. The file is read a row at a time.
+Rows with problems can be moved to a quarantine file and only the clean rows
+imported.
+
+Each import type has an ImportSchema. The default schemas only check that the
+import type's own id column (e.g. 'AssetID') doesn't repeat a value. Pass a
+schema to add required columns, restrict the allowed columns or give columns
+types for your site's import templates. A schema with 'conventions' set guesses
+types from Conquest's column naming: columns ending in 'ID' hold whole numbers,
+'UserNumber' columns hold numbers, and 'UserDate' columns and columns ending in
+'Date' hold dates. Guesses can be wrong for a site's own columns (e.g. a text
+'ExternalID'), so they are opt-in.
+
+Examples:
+    >>> from conquest_api.validation import ImportSchema, import_validated
+    >>> schema = ImportSchema(required=['ParentCode', 'AssetDescription'], types={'TypeID': 'integer'}, conventions=True)
+    >>> result = import_validated(token, r'C:\\imports\\import_file.csv', 'Asset', schema)
+    >>> result['validation']
+    {'rows': 5000, 'clean': 4998, 'quarantined': 2, 'header_problems': [],
+     'clean_file': '...\\import_file_CLEAN.csv', 'quarantine_file': '...\\import_file_QUARANTINE.csv'}
+
+"""
+
+import csv
+import os
+import re
+from datetime import datetime as dt
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+from conquest_api.conquest_api import Import, Token, get_output_path
+
+_date_formats = ("%Y-%m-%d", "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M:%S.%f",
+                 "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M:%S.%f",
+                 "%d/%m/%Y", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S.%f")
+_integer_pattern = re.compile(r"^-?\d+$")
+
+
+def _is_integer(value:str) -> bool:
+    return _integer_pattern.match(value) is not None
+
+
+def _is_number(value:str) -> bool:
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_date(value:str) -> bool:
+    for date_format in _date_formats:
+        try:
+            dt.strptime(value, date_format)
+        except ValueError:
+            continue
+        return True
+    return False
+
+
+_checks = { "integer": _is_integer, "number": _is_number, "date": _is_date, "text": lambda value: True }
+
+
+class ImportSchema(object):
+    def __init__(self, required:Iterable[str]=(), types:Union[Dict[str, str], None]=None, unique:Iterable[str]=(),
+                 allowed:Union[Iterable[str], None]=None, conventions:bool=False) -> None:
+        """Rules an import file is checked against.
+
+        Args:
+            required (iterable, optional): Columns which must be in the file and
+                have a value in every row.
+            types (dict or None, optional): Column -> type, where type is one of
+                'integer', 'number', 'date' or 'text'. Empty values are allowed
+                unless the column is required.
+            unique (iterable, optional): Columns whose values may not repeat
+                (empty values are ignored). Only checked if the column is in
+                the file.
+            allowed (iterable or None, optional): If provided, every column must
+                be one of these (or a required column).
+            conventions (bool, optional): Give columns not listed in 'types' a
+                type from their name (see the module notes). Defaults to False.
+
+        Raises:
+            ValueError: If a type isn't a valid option.
+
+        """
+        self.required = list(required)
+        self.types = dict(types or {})
+        self.unique = list(unique)
+        self.allowed = None if allowed is None else set(allowed) | set(self.required)
+        self.conventions = conventions
+        for column, column_type in self.types.items():
+            if column_type not in _checks:
+                raise ValueError(f"Type of {column_type} for column {column} is not a valid option.")
+
+    def column_type(self, column:str) -> str:
+        """Returns the type of a column: 'integer', 'number', 'date' or 'text'.
+
+        """
+        if column in self.types:
+            return self.types[column]
+        if self.conventions:
+            if re.match(r"^UserNumber\d+$", column):
+                return "number"
+            if re.match(r"^UserDate\d+$", column) or column.endswith("Date"):
+                return "date"
+            if column.endswith("ID"):
+                return "integer"
+        return "text"
+
+
+#: default schema of each import type
+SCHEMAS = { import_type: ImportSchema(unique=[import_type+"ID"])
+            for import_type in ("Action", "Asset", "Defect", "Request", "AssetInspection", "RiskEvent", "LogBook") }
+
+
+class ImportValidator(object):
+    def __init__(self, import_type:str, schema:Union[ImportSchema, None]=None) -> None:
+        """Validator for import files of one import type.
+
+        Args:
+            import_type (str): Type of import. See Import.import_types.
+            schema (ImportSchema or None, optional): Rules to check. Defaults to
+                the import type's schema in SCHEMAS.
+
+        Raises:
+            ValueError: If import_type is not a valid import type.
+
+        """
+        if import_type not in SCHEMAS:
+            raise ValueError(f"Import type of {import_type} is not a valid option.")
+        self.import_type = import_type
+        self.schema = SCHEMAS[import_type] if schema is None else schema
+
+    def check_header(self, fieldnames:Union[List[str], None]) -> List[str]:
+        """Returns a list of problems with a file's header row (empty if none).
+
+        Header problems affect every row, so a file with any can't be imported.
+
+        """
+        if not fieldnames:
+            return ["The file has no header row"]
+        problems = []
+        seen = set()
+        for column in fieldnames:
+            if not column or not column.strip():
+                problems.append("A column has no name")
+            elif column != column.strip():
+                problems.append(f"Column '{column}' has spaces around its name")
+            elif column in seen:
+                problems.append(f"Column '{column}' appears more than once")
+            elif self.schema.allowed is not None and column not in self.schema.allowed:
+                problems.append(f"Column '{column}' is not an allowed column")
+            seen.add(column)
+        for column in self.schema.required:
+            if column not in seen:
+                problems.append(f"Required column '{column}' is missing")
+        return problems
+
+    def validate(self, filename:str) -> Iterator[Tuple]:
+        """Generator which checks each row of a file.
+
+        Args:
+            filename (str): Path of the CSV file to check.
+
+        Yields:
+            Tuple of the row's line number, the row (dict) and a list of its
+            problems (empty for a clean row).
+
+        Raises:
+            ValueError: If the header row has problems (see 'check_header').
+
+        """
+        with open(filename, newline="", encoding="utf-8-sig") as open_file:
+            reader = csv.DictReader(open_file)
+            problems = self.check_header(reader.fieldnames)
+            if problems:
+                raise ValueError("; ".join(problems))
+            checks = [(column, _checks[self.schema.column_type(column)], self.schema.column_type(column))
+                      for column in reader.fieldnames]
+            unique = { column: set() for column in self.schema.unique if column in reader.fieldnames }
+            for row in reader:
+                yield reader.line_num, row, self._check_row(row, checks, unique)
+
+    def split(self, filename:str, clean_filename:Union[str, None]=None,
+              quarantine_filename:Union[str, None]=None) -> dict:
+        """Writes a file's clean rows and its rows with problems to separate files.
+
+        The clean file has the same columns as the original. The quarantine
+        file adds a 'Row' column (the row's line number in the original) and a
+        'Problems' column describing what is wrong with each row.
+
+        Args:
+            filename (str): Path of the CSV file to check.
+            clean_filename (str or None, optional): Path of the clean file.
+                Defaults to the file's name with '_CLEAN' added, in the output
+                path.
+            quarantine_filename (str or None, optional): Path of the quarantine
+                file. Defaults to the file's name with '_QUARANTINE' added, in
+                the output path.
+
+        Returns:
+            A dict containing:
+                rows (int): Number of rows checked.
+                clean (int): Number of clean rows.
+                quarantined (int): Number of rows with problems.
+                header_problems (list): Problems with the header row. If there
+                    are any, no rows are checked and no files are written.
+                clean_file (str or None): Path of the clean file.
+                quarantine_file (str or None): Path of the quarantine file, None
+                    if no rows had problems.
+
+        """
+        name, ext = os.path.splitext(os.path.basename(filename))
+        clean_filename = clean_filename or os.path.join(get_output_path(), name+"_CLEAN"+ext)
+        quarantine_filename = quarantine_filename or os.path.join(get_output_path(), name+"_QUARANTINE"+ext)
+        summary = dict(rows=0, clean=0, quarantined=0, header_problems=[], clean_file=None, quarantine_file=None)
+        with open(filename, newline="", encoding="utf-8-sig") as open_file:
+            fieldnames = csv.DictReader(open_file).fieldnames
+        summary["header_problems"] = self.check_header(fieldnames)
+        if summary["header_problems"]:
+            return summary
+        quarantine = quarantine_file = None
+        try:
+            with open(clean_filename, "w", newline="", encoding="utf-8") as clean_file:
+                clean = csv.DictWriter(clean_file, fieldnames=fieldnames, extrasaction="ignore")
+                clean.writeheader()
+                for line_num, row, problems in self.validate(filename):
+                    summary["rows"] += 1
+                    if not problems:
+                        clean.writerow(row)
+                        summary["clean"] += 1
+                        continue
+                    if quarantine is None:
+                        quarantine_file = open(quarantine_filename, "w", newline="", encoding="utf-8")
+                        quarantine = csv.DictWriter(quarantine_file, fieldnames=["Row"]+fieldnames+["Problems"],
+                                                    extrasaction="ignore")
+                        quarantine.writeheader()
+                    quarantine.writerow(dict(row, Row=line_num, Problems="; ".join(problems)))
+                    summary["quarantined"] += 1
+        finally:
+            if quarantine_file is not None:
+                quarantine_file.close()
+        summary["clean_file"] = clean_filename
+        summary["quarantine_file"] = quarantine_filename if quarantine is not None else None
+        return summary
+
+    def _check_row(self, row:dict, checks:List[Tuple], unique:Dict[str, set]) -> List[str]:
+        problems = []
+        if None in row:
+            problems.append("The row has more values than there are columns")
+        for column, check, column_type in checks:
+            value = row[column]
+            if value is None:
+                problems.append("The row has fewer values than there are columns")
+                break
+            value = value.strip()
+            if not value:
+                if column in self.schema.required:
+                    problems.append(f"{column} is required")
+                continue
+            if not check(value):
+                problems.append(f"{column} value '{value}' is not a valid {column_type}")
+            if column in unique:
+                if value in unique[column]:
+                    problems.append(f"{column} value '{value}' is repeated")
+                unique[column].add(value)
+        return problems
+
+
+def import_validated(token:Token, filename:str, import_type:str, schema:Union[ImportSchema, None]=None,
+                     poll_interval:float=0.1, max_interval:float=2.0) -> dict:
+    """Validates a file, quarantines rows with problems and imports the clean rows.
+
+    Args:
+        token (Token): Token object.
+        filename (str): Path of the CSV file to import.
+        import_type (str): Type of import. See Import.import_types.
+        schema (ImportSchema or None, optional): See ImportValidator.
+        poll_interval (float, optional): See Import.wait. Defaults to 0.1.
+        max_interval (float, optional): See Import.wait. Defaults to 2.0.
+
+    Returns:
+        The dict returned by Import.add, with a 'validation' key holding the
+        summary returned by ImportValidator.split. If the header row has
+        problems, or no rows are clean, nothing is uploaded and the batch is None.
+
+    Raises:
+        ValueError: If import_type is not a valid import type.
+
+    """
+    importer = Import(token)
+    validation = ImportValidator(import_type, schema).split(filename)
+    if validation["header_problems"]:
+        result = importer.result(None, False, "; ".join(validation["header_problems"]))
+    elif not validation["clean"]:
+        result = importer.result(None, False, "No rows passed validation.")
+    else:
+        result = importer.add(validation["clean_file"], import_type, poll_interval, max_interval)
+    result["validation"] = validation
+    return result
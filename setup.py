@@ -6,6 +6,8 @@ setup(name='conquest_api',
       packages=['conquest_api'],
       author_email='nduncan.au@gmail.com',
       install_requires=['requests'],
+      extras_require={'async': ['aiohttp'], 'fast': ['orjson']},
+      entry_points={'console_scripts': ['conquest-export=conquest_api.export:main']},
       version='0.9',
       license='GPLv3',
       description='A Python wrapper for working with the Conquest API'
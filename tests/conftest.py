@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+from benchmarks.server import create_server
+
+
+@pytest.fixture
+def server():
+    """Mock Conquest server running in a background thread.
+
+    """
+    server = create_server()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = "http://{}:{}/".format(*server.server_address)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def finishes(function, timeout=10):
+    """Runs a function in a thread, returning its result, or fails if it doesn't finish in time.
+
+    """
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=function()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "timed out"
+    return result.get("value")
+
+
+def fail(server, name, status, count=1):
+    """Makes the server answer the next 'count' calls of a handler method with an error status.
+
+    """
+    remaining = [count]
+    handler = server.RequestHandlerClass
+    original = getattr(handler, name)
+
+    def failing(self, *args, **kwargs):
+        if remaining[0]:
+            remaining[0] -= 1
+            return self.send({ "Message": "An error has occurred." }, status, headers={ "Retry-After": "0" })
+        return original(self, *args, **kwargs)
+
+    server.RequestHandlerClass = type("FailingHandler", (handler,), { name: failing })
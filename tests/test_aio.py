@@ -0,0 +1,75 @@
+import asyncio
+import csv
+
+import aiohttp
+import pytest
+
+from conquest_api import aio
+from conquest_api import conquest_api
+
+from conftest import fail
+
+
+def test_error_csv_is_written(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(conquest_api, "output_path", str(tmp_path))
+    server.RequestHandlerClass.state.config.update(batch_time=0)
+    filename = tmp_path/"assets.csv"
+    filename.write_text("AssetID,AssetDescription\n1,Pump station\n2,ERROR\n")
+
+    async def add():
+        async with aio.AsyncClient() as client:
+            token = aio.AsyncToken(server.url, "user", "password", "Conquest Live", client=client)
+            return await aio.AsyncImport(token).add(str(filename), "Asset", poll_interval=0.01)
+
+    result = asyncio.run(add())
+    assert not result["success"]
+    with open(result["error_file"], newline="", encoding="utf-8") as open_file:
+        rows = list(csv.reader(open_file))
+    assert rows[0] == ["AssetID", "AssetDescription", "Error"] and rows[1][:2] == ["2", "ERROR"]
+
+
+def test_rejected_refresh_token_falls_back_to_password(server):
+    state = server.RequestHandlerClass.state
+
+    async def refresh():
+        async with aio.AsyncClient() as client:
+            token = aio.AsyncToken(server.url, "user", "password", "Conquest Live", client=client)
+            await token.get_token()
+            state.refresh_tokens.clear()
+            await token.refresh()
+            return await aio.AsyncSystem(token).version()
+
+    assert asyncio.run(refresh())["Version"] == "benchmark"
+    assert state.counts["token refresh rejected"] == 1 and state.counts["token password"] == 2
+
+
+def test_client_times_out_by_default():
+    assert aio.AsyncClient().timeout == (10, 120)
+
+
+def test_error_responses_raise(server):
+    fail(server, "record", 500)
+
+    async def get():
+        async with aio.AsyncClient() as client:
+            token = aio.AsyncToken(server.url, "user", "password", "Conquest Live", client=client)
+            with pytest.raises(aiohttp.ClientResponseError):
+                await aio.AsyncAsset(token).get_detailed([1, 2], limit=1)
+            return await aio.AsyncAsset(token).get_detailed([1, 2, 10])
+
+    # not found (10) is an answer rather than a failure
+    assert sorted(asyncio.run(get())) == [1, 2]
+
+
+def test_failed_upload_raises(server, tmp_path):
+    fail(server, "import_add", 500)
+    filename = tmp_path/"assets.csv"
+    filename.write_text("AssetID\n1\n")
+
+    async def add():
+        async with aio.AsyncClient() as client:
+            token = aio.AsyncToken(server.url, "user", "password", "Conquest Live", client=client)
+            return await aio.AsyncImport(token).add(str(filename), "Asset")
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(add())
@@ -0,0 +1,58 @@
+from conquest_api import conquest_api
+from conquest_api.cache import MISS, LRUCache, SQLiteCache, TieredCache
+
+
+def connect(server, cache):
+    client = conquest_api.Client(cache=cache)
+    return conquest_api.Token(server.url, "user", "password", "Conquest Live", client=client)
+
+
+def requests_to(server, endpoint):
+    return server.RequestHandlerClass.state.counts[endpoint]
+
+
+def test_delete_invalidates_cached_actions(server):
+    action = conquest_api.Action(connect(server, LRUCache()))
+    assert list(action.get_detailed([3, 4])) == [3, 4]
+    assert list(action.get_detailed([3, 4])) == [3, 4]
+    assert requests_to(server, "GET api/action/{id}") == 2
+    action.delete([3])
+    # the deleted action is fetched again (and not found), the other is still cached
+    assert list(action.get_detailed([3, 4])) == [4]
+    assert requests_to(server, "GET api/action/{id}") == 3
+
+
+def test_asset_import_invalidates_cached_assets(server, tmp_path):
+    server.RequestHandlerClass.state.config.update(batch_time=0)
+    token = connect(server, LRUCache())
+    asset, action = conquest_api.Asset(token), conquest_api.Action(token)
+    asset.get_detailed([5])
+    asset.get_basic([5])
+    action.get_detailed([5])
+    filename = tmp_path / "assets.csv"
+    filename.write_text("AssetID,AssetDescription\n5,Renamed\n")
+    assert conquest_api.Import(token).add(str(filename), "Asset")["success"]
+    asset.get_detailed([5])
+    asset.get_basic([5])
+    action.get_detailed([5])
+    assert requests_to(server, "GET api/asset/{id}") == 2
+    assert requests_to(server, "GET api/asset/basic") == 2
+    # actions aren't changed by an asset import
+    assert requests_to(server, "GET api/action/{id}") == 1
+
+
+def test_not_found_is_cached(server):
+    asset = conquest_api.Asset(connect(server, LRUCache()))
+    assert asset.get_detailed([10]) == {}
+    assert asset.get_detailed([10]) == {}
+    assert requests_to(server, "GET api/asset/{id}") == 1
+
+
+def test_tiered_cache_fills_the_faster_tier(tmp_path):
+    fast, slow = LRUCache(), SQLiteCache(str(tmp_path / "cache.db"))
+    slow.set(("asset_basic", "Conquest Live", "1"), { "AssetID": 1 })
+    cache = TieredCache(fast, slow)
+    assert cache.get(("asset_basic", "Conquest Live", "1")) == { "AssetID": 1 }
+    assert fast.get(("asset_basic", "Conquest Live", "1")) == { "AssetID": 1 }
+    cache.invalidate("asset_basic", "Conquest Live")
+    assert slow.get(("asset_basic", "Conquest Live", "1")) is MISS
@@ -0,0 +1,83 @@
+import io
+
+import pytest
+import requests
+
+import conquest_api
+from conquest_api.cache import LRUCache
+
+from conftest import fail, finishes
+
+
+def configure(server, **config):
+    server.RequestHandlerClass.state.config.update(config)
+
+
+def test_token_refresh_does_not_wait_for_a_concurrency_slot(server):
+    # tokens inside the refresh margin are refreshed before every request
+    configure(server, token_lifetime=182)
+    client = conquest_api.Client(max_concurrency=1)
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live", client=client)
+    assets = finishes(lambda: conquest_api.Asset(token).get_basic(1))
+    assert list(assets) == [1]
+    assert client.limiter.in_flight == 0
+
+
+def test_token_refresh_with_every_slot_in_use(server):
+    configure(server, token_lifetime=182)
+    client = conquest_api.Client(max_concurrency=4)
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live", client=client)
+    assets = finishes(lambda: conquest_api.Asset(token).get_basic(list(range(1, 200)), workers=4))
+    assert len(assets) == 180
+
+
+def test_rate_limited_upload_is_sent_again_in_full(server, tmp_path):
+    configure(server, batch_time=0)
+    fail(server, "import_add", 429)
+    filename = tmp_path/"assets.csv"
+    filename.write_text("AssetID,AssetDescription\n1,Pump station\n2,ERROR\n")
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live")
+    result = conquest_api.Import(token).add(str(filename), "Asset", poll_interval=0.01)
+    assert not result["success"]
+    [(_, errors, header)] = server.RequestHandlerClass.state.batches.values()
+    assert header == ["AssetID", "AssetDescription"] and len(errors) == 1
+
+
+def test_unrewindable_body_is_not_sent_again(server):
+    fail(server, "import_add", 429)
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live")
+    body = (line for line in [b"AssetID\r\n", b"1\r\n"])
+    response = token.client.request("POST", server.url+"api/import/add/Asset", token=token, data=body)
+    assert response.status_code == 429
+
+
+def test_error_responses_are_failures_not_records(server):
+    fail(server, "record", 500, count=2)
+    client = conquest_api.Client(cache=LRUCache())
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live", client=client)
+    asset = conquest_api.Asset(token)
+    assets = asset.get_detailed([1, 2])
+    assert assets == {} and sorted(assets.failed) == [1, 2]
+    # the error wasn't cached
+    assert list(asset.get_detailed([1, 2])) == [1, 2]
+
+
+def test_import_state_error_raises(server):
+    fail(server, "import_state", 500)
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live")
+    importer = conquest_api.Import(token)
+    batch = importer.upload_file(io.BytesIO(b"AssetID\r\n1\r\n"), "Asset", "assets.csv")
+    with pytest.raises(requests.HTTPError):
+        importer.get_state(batch)
+
+
+def test_delete_records_each_failure_and_carries_on(server):
+    fail(server, "delete", 500, count=1)
+    client = conquest_api.Client(cache=LRUCache())
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live", client=client)
+    action = conquest_api.Action(token)
+    assert action.find_by_field("UserText1", "text-3-1")["ActionID"] == 3
+    deleted = action.delete([1, 2, 3])
+    assert deleted == { 2: {}, 3: {} } and list(deleted.failed) == [1]
+    # the cached field search was invalidated
+    assert action.find_by_field("UserText1", "text-3-1") == {}
@@ -0,0 +1,52 @@
+import pytest
+
+from conquest_api import conquest_api
+from conquest_api.deleter import BulkDeleter, DeleteJournal
+
+from conftest import fail
+
+
+def interrupted(items, after):
+    """Yields the first 'after' items, then stops the run as a crash would.
+
+    """
+    for index, item in enumerate(items):
+        if index == after:
+            raise KeyboardInterrupt
+        yield item
+
+
+def test_interrupted_run_resumes_from_the_journal(server, tmp_path):
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live")
+    journal = str(tmp_path / "journal.jsonl")
+    with pytest.raises(KeyboardInterrupt):
+        BulkDeleter(token, journal, workers=1).run(interrupted(range(1, 21), 12))
+    assert len(DeleteJournal(journal).load()) == 12
+
+    summary = BulkDeleter(token, journal, workers=4).run(range(1, 21))
+    assert summary["total"] == 20 and summary["skipped"] == 12
+    # 20 is missing on the server, and 10 was confirmed missing by the first run
+    assert summary["deleted"] == 7 and summary["missing"] == 1 and summary["failed_actions"] == {}
+    # no action was sent twice
+    assert server.RequestHandlerClass.state.counts["DELETE api/action/{id}"] == 20
+    outcomes = DeleteJournal(journal).load()
+    assert len(outcomes) == 20 and set(outcomes.values()) == { "deleted", "missing" }
+
+
+def test_failed_deletes_are_retried_by_the_next_run(server, tmp_path):
+    fail(server, "delete", 500, count=3)
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live")
+    journal = str(tmp_path / "journal.jsonl")
+    summary = BulkDeleter(token, journal, workers=4).run(range(1, 10))
+    assert summary["failed"] == 3 and summary["deleted"] == 6 and len(summary["failed_actions"]) == 3
+
+    summary = BulkDeleter(token, journal, workers=4).run(range(1, 10))
+    assert summary["skipped"] == 6 and summary["deleted"] == 3 and summary["failed"] == 0
+
+
+def test_partly_written_line_is_ignored(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text('{"action": "1", "outcome": "failed", "time": 0}\n'
+                    '{"action": "1", "outcome": "deleted", "time": 1}\n'
+                    '{"action": "2", "outc')
+    assert DeleteJournal(str(path)).load() == { "1": "deleted" }
@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from conquest_api import export
+
+
+def run(server, tmp_path, monkeypatch, *options):
+    monkeypatch.setenv("CONQUEST_PASSWORD", "password")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    ids = tmp_path/"ids.txt"
+    ids.write_text("1\n2\n3\n")
+    with pytest.raises(SystemExit) as exit:
+        export.main(["assets", str(ids), str(tmp_path/"assets.ndjson"), "--api-url", server.url,
+                     "--username", "user", "--connection", "Conquest Live", *options])
+    assert exit.value.code == 0
+    return (tmp_path/"assets.ndjson").read_text().count("\n")
+
+
+def test_cli_doesnt_store_tokens_by_default(server, tmp_path, monkeypatch):
+    assert run(server, tmp_path, monkeypatch) == 3
+    assert not os.path.exists(tmp_path/".conquest_api")
+
+
+def test_cli_token_store_flag(server, tmp_path, monkeypatch):
+    path = tmp_path/"tokens.json"
+    assert run(server, tmp_path, monkeypatch, "--token-store", str(path)) == 3
+    assert path.exists()
@@ -0,0 +1,22 @@
+from conquest_api import conquest_api
+from conquest_api.hierarchy import Hierarchy
+
+
+def test_only_ancestors_are_remembered(server):
+    server.RequestHandlerClass.state.config.update(missing_every=0)
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live")
+    hierarchy = Hierarchy(token, workers=4, children=lambda asset: [2*int(asset), 2*int(asset)+1] if int(asset) < 512 else [])
+    assert sum(1 for _ in hierarchy.descendants(1)) == 1023
+    assert hierarchy._records == {}
+    assert [(asset, depth) for asset, depth, _ in hierarchy.ancestors(999)] == [(999, 0), (499, 1), (249, 2), (124, 3),
+                                                                              (62, 4), (31, 5), (15, 6), (7, 7), (3, 8), (1, 9)]
+    assert sorted(hierarchy._records, key=int) == ["1", "3", "7", "15", "31", "62", "124", "249", "499"]
+
+
+def test_index_keeps_ids_not_records(server):
+    server.RequestHandlerClass.state.config.update(missing_every=0)
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live")
+    hierarchy = Hierarchy(token, workers=4)
+    assert hierarchy.index(range(2, 16)) == 14
+    assert hierarchy._records == {} and sorted(hierarchy._index["3"].values()) == [6, 7]
+    assert sorted(asset for asset, _, _ in hierarchy.descendants(3)) == [3, 6, 7, 12, 13, 14, 15]
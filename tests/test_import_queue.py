@@ -0,0 +1,26 @@
+import time
+from concurrent import futures
+
+import pytest
+
+import conquest_api
+
+
+def test_close_without_waiting_cancels_outstanding_imports(server, tmp_path):
+    server.RequestHandlerClass.state.config.update(batch_time=30)
+    filename = tmp_path/"assets.csv"
+    filename.write_text("AssetID\n1\n")
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live")
+    queue = conquest_api.ImportQueue(token, workers=1)
+    handles = [queue.submit(str(filename), "Asset") for _ in range(3)]
+    # wait for the first upload, leaving the others queued
+    while handles[0].batch is None:
+        time.sleep(0.01)
+    queue.close(wait=False)
+    for handle in handles:
+        with pytest.raises(futures.CancelledError):
+            handle.result(timeout=5)
+    assert queue._pending == 0
+    with pytest.raises(RuntimeError):
+        queue.submit(str(filename), "Asset")
+    assert queue._pending == 0
@@ -0,0 +1,33 @@
+import io
+
+from conquest_api import conquest_api
+from conquest_api.importer import RowImporter
+
+
+def test_row_with_extra_fields_is_reported_not_fatal(server):
+    server.RequestHandlerClass.state.config.update(batch_time=0)
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live")
+    rows = [{ "AssetID": "1" }, { "AssetID": "2", "Extra": "x" }, { "AssetID": "3" }]
+    summary = RowImporter(token, "Asset", max_rows=1, poll_interval=0.01).run(rows)
+    assert summary["rows"] == 3 and not summary["success"]
+    assert list(summary["failed_rows"]) == [1] and "Extra" in summary["failed_rows"][1]["Error"]
+    assert [batch["first_row"] for batch in summary["batches"]] == [0, 2]
+    assert all(batch["success"] for batch in summary["batches"])
+
+
+def test_upload_dropped_after_it_was_received_is_not_sent_again(server):
+    server.RequestHandlerClass.state.config.update(batch_time=0)
+    handler = server.RequestHandlerClass
+    original = handler.import_add
+
+    def import_add(self, body):
+        # the batch is created, but the connection drops before its id is sent
+        self.wfile = io.BytesIO()
+        original(self, body)
+        self.close_connection = True
+
+    server.RequestHandlerClass = type("DroppingHandler", (handler,), { "import_add": import_add })
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live")
+    summary = RowImporter(token, "Asset", poll_interval=0.01).run([{ "AssetID": "1" }])
+    assert not summary["success"] and "ConnectionError" in summary["batches"][0]["error_msg"]
+    assert len(handler.state.batches) == 1
@@ -0,0 +1,36 @@
+import io
+import json
+
+from conquest_api import conquest_api
+from conquest_api.metrics import MetricsRegistry, TraceLog
+
+from conftest import fail
+
+
+def test_requests_retries_and_tokens_are_counted(server):
+    fail(server, "record", 503)
+    client = conquest_api.Client(backoff=0)
+    metrics = MetricsRegistry().install(client)
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live", client=client)
+    assert list(conquest_api.Asset(token).get_detailed([1, 10])) == [1]
+    assert metrics.requests.value("api/Asset/{id}", "GET", "503") == 1
+    assert metrics.requests.value("api/Asset/{id}", "GET", "404") == 1
+    assert metrics.retries.value("api/Asset/{id}") == 1
+    assert metrics.tokens.value("password", "true") == 1
+    summary = metrics.as_dict()["api/Asset/{id}"]
+    assert summary["count"] == 3 and summary["errors"] == 2
+    assert 'conquest_requests_total{endpoint="api/Asset/{id}",method="GET",status="200"} 1' in metrics.to_prometheus()
+    metrics.uninstall(client)
+    conquest_api.Asset(token).get_detailed([2])
+    assert metrics.as_dict()["api/Asset/{id}"]["count"] == 3
+
+
+def test_trace_log_writes_a_line_per_request(server):
+    client = conquest_api.Client()
+    stream = io.StringIO()
+    TraceLog(stream).install(client)
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live", client=client)
+    conquest_api.Asset(token).get_detailed([1])
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line.get("endpoint", line.get("event")) for line in lines] == ["api/token", "token", "api/Asset/{id}"]
+    assert lines[-1]["status"] == 200 and lines[-1]["error"] is None and "url" not in lines[-1]
@@ -0,0 +1,31 @@
+from conquest_api import conquest_api
+from conquest_api.mirror import Mirror
+
+
+def requests_to(server, endpoint):
+    return server.RequestHandlerClass.state.counts[endpoint]
+
+
+def test_fresh_records_are_answered_locally(server, tmp_path):
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live")
+    mirror = Mirror(token, str(tmp_path / "mirror.db"), fields={ "Action": ["UserText1"] })
+    assert mirror.load("Action", range(1, 11)) == 9
+    assert mirror.load("Action", range(1, 11)) == 0
+    assert mirror.get("Action", 4)["ActionID"] == 4
+    assert [record["ActionID"] for record in mirror.find_by_field("Action", "UserText1", "text-4-1")] == [4]
+    # only the missing action is asked for again
+    assert requests_to(server, "GET api/action/{id}") == 11
+    mirror.close()
+
+
+def test_stale_records_are_fetched_again_and_removed_if_gone(server, tmp_path):
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live")
+    mirror = Mirror(token, str(tmp_path / "mirror.db"), ttl=0)
+    assert mirror.load("Action", [1, 2, 3]) == 3
+    server.RequestHandlerClass.state.deleted.add("2")
+    assert mirror.refresh("Action") == 2
+    assert mirror.stats()["records"] == { "Action": 2 }
+    assert mirror.get("Action", 3)["ActionID"] == 3
+    assert mirror.get("Action", 2) is None
+    assert requests_to(server, "GET api/action/{id}") == 8
+    mirror.close()
@@ -0,0 +1,13 @@
+from conquest_api.pool import ConnectionPool
+
+from conftest import finishes
+
+
+def test_bulk_fetch_survives_token_refresh_on_every_connection(server):
+    # tokens inside the refresh margin are refreshed before every request
+    server.RequestHandlerClass.state.config.update(token_lifetime=180)
+    with ConnectionPool.connect(server.url, "user", "password", connection="Conquest Live", workers=4) as pool:
+        assets = finishes(lambda: pool.get_basic(list(range(1, 400))), timeout=30)
+    assert sorted(assets) == ["Conquest Live", "Conquest Test", "Conquest Training"]
+    assert all(len(records) == 360 for records in assets.values())
+    assert not assets.failed
@@ -0,0 +1,33 @@
+import io
+
+from conquest_api.records import RecordTable
+
+
+def records():
+    return [{ "AssetID": 1, "AssetDescription": "Pump", "UserNumber1": 2 },
+            { "AssetID": 2, "AssetDescription": "Valve", "UserNumber1": 2.5, "UserText1": "x" },
+            { "AssetID": 3, "AssetDescription": "Pipe", "UserNumber1": None }]
+
+
+def test_records_round_trip():
+    table = RecordTable("AssetID", records())
+    assert len(table) == 3 and 2 in table and 4 not in table
+    assert table[1] == { "AssetID": 1, "AssetDescription": "Pump", "UserNumber1": 2, "UserText1": None }
+    assert table[2]["UserNumber1"] == 2.5 and table[3]["UserNumber1"] is None
+    assert table.column("AssetDescription") == ["Pump", "Valve", "Pipe"]
+
+
+def test_replaced_record_and_mixed_types():
+    table = RecordTable("AssetID", records())
+    table.append({ "AssetID": 1, "AssetDescription": "New pump", "UserNumber1": "unknown" })
+    assert len(table) == 3 and list(table) == [1, 2, 3]
+    assert table[1]["AssetDescription"] == "New pump" and table[1]["UserNumber1"] == "unknown"
+    assert table[2]["UserNumber1"] == 2.5
+
+
+def test_select_filter_and_csv():
+    table = RecordTable("AssetID", records()).filter(lambda record: record["UserNumber1"]).select(["AssetDescription"])
+    assert list(table) == [1, 2] and table.fields == ["AssetID", "AssetDescription"]
+    open_file = io.StringIO(newline="")
+    assert table.to_csv(open_file) == 2
+    assert open_file.getvalue().splitlines() == ["AssetID,AssetDescription", "1,Pump", "2,Valve"]
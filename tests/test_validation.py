@@ -0,0 +1,30 @@
+from conquest_api import conquest_api
+from conquest_api.validation import ImportSchema, ImportValidator, import_validated
+
+
+def write(tmp_path):
+    filename = tmp_path / "assets.csv"
+    filename.write_text("AssetID,ExternalID,InstallDate\n"
+                        "1,ABC-1,2019-01-18 10:00:00.000\n"
+                        "2,ABC-2,18/01/2019\n")
+    return str(filename)
+
+
+def test_default_schema_does_not_guess_types(tmp_path):
+    problems = [row[2] for row in ImportValidator("Asset").validate(write(tmp_path))]
+    assert problems == [[], []]
+
+
+def test_conventions_guess_types_from_column_names(tmp_path):
+    validator = ImportValidator("Asset", ImportSchema(conventions=True))
+    problems = [row[2] for row in validator.validate(write(tmp_path))]
+    assert len(problems) == 2 and all(len(row) == 1 and "ExternalID" in row[0] for row in problems)
+
+
+def test_import_validated_keeps_rows_with_site_columns(server, tmp_path, monkeypatch):
+    server.RequestHandlerClass.state.config.update(batch_time=0)
+    monkeypatch.setattr(conquest_api, "output_path", str(tmp_path))
+    token = conquest_api.Token(server.url, "user", "password", "Conquest Live")
+    result = import_validated(token, write(tmp_path), "Asset")
+    assert result["validation"]["clean"] == 2 and result["validation"]["quarantined"] == 0
+    assert result["success"]